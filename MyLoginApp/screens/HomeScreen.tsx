@@ -109,13 +109,15 @@ export default function HomeScreen({ skipAnimation }: { skipAnimation?: boolean
         return;
       }
 
-      if (!Array.isArray(data)) {
+      // list is cursor-paginated: { next, results }
+      const items = Array.isArray(data) ? data : data?.results;
+      if (!Array.isArray(items)) {
         console.error("❌ Expected an array but got:", data);
         setErrorMessage("Unexpected response format.");
         return;
       }
 
-      const formatted: CardProps[] = data.map((item: any) => ({
+      const formatted: CardProps[] = items.map((item: any) => ({
         id: item.item_id,
         title: item.title,
         address: item.address,
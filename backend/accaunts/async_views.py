@@ -0,0 +1,163 @@
+"""
+Async versions of the login, refresh and social sign-in endpoints, mounted
+instead of the sync ones when ASYNC_VIEWS is on (ASGI deployments).
+
+Database access goes through the async ORM. CPU-heavy password hashing and
+the blocking Google certificate check run on worker threads, and Apple's
+signing keys are fetched with httpx when it is installed (on a worker
+thread with requests otherwise) and kept for APPLE_KEYS_TTL seconds.
+"""
+import json
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from google.auth.transport.requests import Request
+from google.oauth2 import id_token
+from jose import jwt as jose_jwt # type: ignore
+from rest_framework import exceptions
+
+from backend.asyncapi import AsyncAPIView
+
+from .authentication import create_access_token, create_refresh_token, decode_refresh_token
+from .models import User
+from .tokens import arefresh_token_valid, astore_refresh_token
+from .views import GOOGLE_CLIENT_ID
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional
+    httpx = None
+
+APPLE_KEYS_URL = "https://appleid.apple.com/auth/keys"
+APPLE_KEYS_TTL = 3600  # seconds; an unknown kid refetches sooner (key rotation)
+
+_apple_keys = {"keys": [], "fetched_at": 0.0}
+
+
+async def _fetch_apple_keys():
+    if httpx is not None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(APPLE_KEYS_URL)
+    else:
+        response = await sync_to_async(requests.get, thread_sensitive=False)(APPLE_KEYS_URL, timeout=10)
+    response.raise_for_status()
+    return response.json()["keys"]
+
+
+async def apple_key(kid):
+    """Apple's public key with this kid, or None."""
+    fresh = time.monotonic() - _apple_keys["fetched_at"] < APPLE_KEYS_TTL
+    key = next((k for k in _apple_keys["keys"] if k["kid"] == kid), None)
+    if key is None or not fresh:
+        _apple_keys["keys"] = await _fetch_apple_keys()
+        _apple_keys["fetched_at"] = time.monotonic()
+        key = next((k for k in _apple_keys["keys"] if k["kid"] == kid), None)
+    return key
+
+
+async def issue_tokens(user_id):
+    access_token = create_access_token(user_id)
+    refresh_token = create_refresh_token(user_id)
+    await astore_refresh_token(user_id, refresh_token)
+    return {'token': access_token, 'refresh_token': refresh_token}
+
+
+async def social_user(email, password):
+    user = await User.objects.filter(email=email).afirst()
+    if not user:
+        user = User(email=email)
+        await sync_to_async(user.set_password)(password)
+        await user.asave()
+    return user
+
+
+class LoginAsyncView(AsyncAPIView):
+    async def post(self, request):
+        email = request.data['email']
+        password = request.data['password']
+
+        user = await User.objects.filter(email=email).afirst()
+
+        if user is None or not await sync_to_async(user.check_password)(password):
+            raise exceptions.AuthenticationFailed('invalid credentials')
+
+        return await issue_tokens(user.id)
+
+
+class RefreshAsyncView(AsyncAPIView):
+    async def post(self, request):
+        refresh_token = (
+            request.COOKIES.get('refresh_token') or
+            request.data.get('refresh_token')
+        )
+        if not refresh_token:
+            raise exceptions.AuthenticationFailed('unauthenticated')
+        id = decode_refresh_token(refresh_token)
+        if not await arefresh_token_valid(id, refresh_token):
+            raise exceptions.AuthenticationFailed('unauthenticated')
+
+        return {
+            'token': create_access_token(id),
+            'refresh_token': refresh_token
+        }
+
+
+class GoogleAuthAsyncView(AsyncAPIView):
+    async def post(self, request):
+        token = request.data.get('token')
+
+        if not token:
+            raise exceptions.AuthenticationFailed('Token not provided')
+
+        try:
+            # fetches Google's certificates with requests; keep it off the event loop
+            googleUser = await sync_to_async(id_token.verify_oauth2_token, thread_sensitive=False)(
+                token, Request(), GOOGLE_CLIENT_ID
+            )
+        except ValueError:
+            raise exceptions.AuthenticationFailed('Invalid Google token')
+
+        if not googleUser or 'email' not in googleUser:
+            raise exceptions.AuthenticationFailed('Failed to retrieve user info from Google')
+
+        user = await social_user(googleUser['email'], token)
+        return await issue_tokens(user.id)
+
+
+@csrf_exempt
+async def apple_auth_async_view(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        body = json.loads(request.body)
+        identity_token = body.get("token")
+
+        if not identity_token:
+            return JsonResponse({"error": "Token not provided"}, status=400)
+
+        headers = jose_jwt.get_unverified_header(identity_token)
+        key = await apple_key(headers["kid"])
+        if not key:
+            return JsonResponse({"error": "Invalid token: key not found"}, status=400)
+
+        decoded = jose_jwt.decode(
+            identity_token,
+            key,
+            algorithms=["RS256"],
+            audience="host.exp.Exponent",
+            issuer="https://appleid.apple.com",
+        )
+
+        email = decoded.get("email")
+        if not email:
+            return JsonResponse({"error": "Email not present in token"}, status=400)
+
+        user = await social_user(email, identity_token)
+        return JsonResponse(await issue_tokens(user.id))
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
@@ -1,9 +1,39 @@
 import jwt
+import copy
 import datetime
+import logging
+import uuid
 from django.conf import settings  # ✅ use Django settings instead of decouple.config
 from rest_framework import exceptions
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 from .models import User
+from .ttlcache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache(TTLCache):
+    """
+    User rows by id, for at most AUTH_USER_CACHE_TTL seconds. Saves and
+    deletes in this process evict the entry (accaunts.signals); other
+    processes pick the change up when their entry expires, so the TTL
+    bounds how stale a user can be.
+    """
+
+    def __init__(self):
+        super().__init__("AUTH_USER_CACHE_SIZE", "AUTH_USER_CACHE_TTL")
+
+    def get(self, user_id):
+        user = super().get(user_id)
+        # a copy per request: views may modify request.user
+        return copy.copy(user) if user is not None else None
+
+    def set(self, user):
+        super().set(user.pk, copy.copy(user))
+
+
+user_cache = UserCache()
+
 
 class JWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -15,10 +45,13 @@ class JWTAuthentication(BaseAuthentication):
         token = auth[1].decode('utf-8')
         user_id = decode_access_token(token)
 
-        try:
-            user = User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            raise exceptions.AuthenticationFailed('User not found')
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                raise exceptions.AuthenticationFailed('User not found')
+            user_cache.set(user)
 
         return (user, None)
 
@@ -30,7 +63,6 @@ def create_access_token(id):
     }, settings.SECRET_KEY, algorithm='HS256')  # ✅
 
 def decode_access_token(token):
-    print("🧪 Decoding with SECRET_KEY:", settings.SECRET_KEY)
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
         return payload['user_id']
@@ -42,15 +74,16 @@ def decode_access_token(token):
 def create_refresh_token(id):
     return jwt.encode({
         'user_id': id,
+        # unique even when a user signs in twice within a second (tokens are stored by hash)
+        'jti': uuid.uuid4().hex,
         'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=7),
         'iat': datetime.datetime.now(datetime.timezone.utc)
     }, settings.REFRESH_SECRET, algorithm='HS256')  # ✅
 
 def decode_refresh_token(token):
-    print("🧪 Decoding with REFRESH_SECRET:", settings.REFRESH_SECRET)
     try:
         payload = jwt.decode(token, settings.REFRESH_SECRET, algorithms=['HS256'])
         return payload['user_id']
     except Exception as e:
-        print("❌ Decode failed:", e)
+        logger.debug("Refresh token rejected: %s", e)
         raise exceptions.AuthenticationFailed('unauthenticated')
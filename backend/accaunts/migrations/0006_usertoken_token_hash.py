@@ -0,0 +1,45 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:20
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_tokens(apps, schema_editor):
+    UserToken = apps.get_model("accaunts", "UserToken")
+    seen = set()
+    # newest first, so a token stored twice keeps its latest row
+    for row in UserToken.objects.order_by("-expired_at", "-pk").iterator(chunk_size=2000):
+        digest = hashlib.sha256(row.token.encode("utf-8")).hexdigest()
+        if digest in seen:
+            row.delete()
+            continue
+        seen.add(digest)
+        row.token_hash = digest
+        row.save(update_fields=["token_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accaunts", "0005_alter_user_first_name_alter_user_last_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usertoken",
+            name="token_hash",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        # one-way: the raw tokens are gone once hashed, so there is nothing to restore
+        migrations.RunPython(hash_tokens),
+        migrations.AlterField(
+            model_name="usertoken",
+            name="token_hash",
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name="usertoken",
+            name="token",
+        ),
+    ]
@@ -37,7 +37,8 @@ class User(AbstractUser):
 
 class UserToken(models.Model):
     user_id = models.IntegerField()
-    token = models.CharField(max_length=255)
+    # sha256 hex of the refresh token (accaunts.tokens); the token itself is never stored
+    token_hash = models.CharField(max_length=64, unique=True)
     password = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     expired_at = models.DateTimeField()
@@ -1,3 +1,153 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+from . import async_views
+from .async_views import LoginAsyncView, RefreshAsyncView
+from .authentication import create_access_token, create_refresh_token, user_cache
+from .models import Reset, User, UserToken
+from .tokens import hash_token, token_cache
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {create_access_token(self.user.id)}"}
+
+    def test_second_request_skips_the_user_query(self):
+        self.assertEqual(self.client.get("/api/user", **self.auth).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/user", **self.auth)
+        self.assertEqual(response.json()["email"], "buyer@example.com")
+
+    def test_save_and_delete_evict(self):
+        self.client.get("/api/user", **self.auth)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(email="stale@example.com")
+            self.user.email = "renamed@example.com"
+            self.user.save()
+        self.assertEqual(self.client.get("/api/user", **self.auth).json()["email"], "renamed@example.com")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get("/api/user", **self.auth).status_code, 403)
+
+    def test_password_reset_evicts(self):
+        self.client.get("/api/user", **self.auth)
+        self.assertIsNotNone(user_cache.get(self.user.id))
+        Reset.objects.create(email=self.user.email, token="t0k3n")
+        self.client.post("/api/reset", {"token": "t0k3n", "password": "new", "password_confirm": "new"},
+                         content_type="application/json", **self.auth)
+        self.assertIsNone(user_cache.get(self.user.id))
+
+    @override_settings(AUTH_USER_CACHE_SIZE=2)
+    def test_bounded_lru(self):
+        users = [User.objects.create_user(email=f"u{i}@example.com", password="pw") for i in range(3)]
+        for user in users:
+            user_cache.set(user)
+        self.assertIsNone(user_cache.get(users[0].id))
+        self.assertEqual(user_cache.get(users[2].id).email, "u2@example.com")
+
+    def test_entries_expire(self):
+        user_cache.set(self.user)
+        with mock.patch("accaunts.ttlcache.time.monotonic", return_value=10 ** 9):
+            self.assertIsNone(user_cache.get(self.user.id))
+
+
+class RefreshTokenStoreTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        User.objects.create_user(email="buyer@example.com", password="pw")
+
+    def login(self):
+        response = self.client.post("/api/login", {"email": "buyer@example.com", "password": "pw"},
+                                    content_type="application/json")
+        return response.json()["refresh_token"]
+
+    def refresh(self, token):
+        return self.client.post("/api/refresh", {"refresh_token": token}, content_type="application/json")
+
+    def test_only_the_hash_is_stored(self):
+        token = self.login()
+        row = UserToken.objects.get()
+        self.assertEqual(row.token_hash, hash_token(token))
+        self.assertNotIn(token, [str(v) for v in UserToken.objects.values_list().get()])
+
+    def test_refresh_is_a_cache_hit_after_login(self):
+        token = self.login()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_refresh_is_one_lookup_on_a_cold_cache(self):
+        token = self.login()
+        token_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresh(token).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_logout_revokes_at_once_here_and_for_good_in_the_db(self):
+        token = self.login()
+        self.client.post("/api/logout", {"refresh_token": token}, content_type="application/json",
+                         HTTP_AUTHORIZATION=f"Bearer {create_access_token(UserToken.objects.get().user_id)}")
+        self.assertFalse(UserToken.objects.exists())
+        self.assertEqual(self.refresh(token).status_code, 403)
+        token_cache.clear()
+        self.assertEqual(self.refresh(token).status_code, 403)
+
+    def test_other_process_revocation_is_bounded_by_the_ttl(self):
+        token = self.login()
+        UserToken.objects.all().delete()  # revoked by another process
+        self.assertEqual(self.refresh(token).status_code, 200)
+        with mock.patch("accaunts.ttlcache.time.monotonic", return_value=10 ** 9):
+            self.assertEqual(self.refresh(token).status_code, 403)
+
+    def test_unknown_token_is_rejected(self):
+        token = self.login()
+        other = User.objects.create_user(email="other@example.com", password="pw")
+        forged = create_refresh_token(other.id)
+        self.assertEqual(self.refresh(forged).status_code, 403)
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+
+class AsyncAuthViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(email="buyer@example.com", password="pw")
+        self.factory = AsyncRequestFactory()
+
+    async def post(self, view, data):
+        request = self.factory.post("/", json.dumps(data), content_type="application/json")
+        response = await view.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_login_then_refresh(self):
+        code, tokens = await self.post(LoginAsyncView, {"email": "buyer@example.com", "password": "pw"})
+        self.assertEqual(code, 200)
+        self.assertTrue(await UserToken.objects.filter(token_hash=hash_token(tokens["refresh_token"])).aexists())
+
+        code, refreshed = await self.post(RefreshAsyncView, {"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(code, 200)
+        self.assertEqual(refreshed["refresh_token"], tokens["refresh_token"])
+
+    async def test_errors_match_the_sync_views(self):
+        sync = await sync_to_async(self.client.post)(
+            "/api/login", {"email": "buyer@example.com", "password": "nope"}, content_type="application/json",
+        )
+        code, body = await self.post(LoginAsyncView, {"email": "buyer@example.com", "password": "nope"})
+        self.assertEqual((code, body), (sync.status_code, sync.json()))
+
+        code, body = await self.post(RefreshAsyncView, {"refresh_token": "not-a-token"})
+        self.assertEqual((code, body), (403, {"detail": "unauthenticated"}))
+
+    async def test_apple_keys_are_cached_until_an_unknown_kid(self):
+        async_views._apple_keys.update(keys=[], fetched_at=0.0)
+        fetch = mock.AsyncMock(return_value=[{"kid": "a"}])
+        with mock.patch.object(async_views, "_fetch_apple_keys", fetch):
+            self.assertEqual(await async_views.apple_key("a"), {"kid": "a"})
+            self.assertEqual(await async_views.apple_key("a"), {"kid": "a"})
+            self.assertEqual(fetch.await_count, 1)
+            self.assertIsNone(await async_views.apple_key("b"))
+            self.assertEqual(fetch.await_count, 2)
@@ -0,0 +1,72 @@
+"""
+Refresh-token store. Rows hold the sha256 of the token under a unique
+index, so checking a token is one indexed lookup and a leaked table holds
+nothing usable.
+
+Recent answers are kept in a small per-process cache: validated tokens
+(with their expiry) and revoked or unknown ones. Logout revokes in the
+database and caches the revocation here at once; other processes may
+still accept the token until their entry expires, so
+REFRESH_TOKEN_CACHE_TTL bounds how long a revoked token keeps working.
+"""
+import datetime
+import hashlib
+
+from django.utils import timezone
+
+from .models import UserToken
+from .ttlcache import TTLCache
+
+REFRESH_TOKEN_LIFETIME = datetime.timedelta(days=7)
+
+# token hash -> (user_id, expired_at) if valid, None if revoked or unknown
+token_cache = TTLCache("REFRESH_TOKEN_CACHE_SIZE", "REFRESH_TOKEN_CACHE_TTL")
+
+_UNCACHED = object()
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _check(entry, user_id):
+    return entry is not None and entry[0] == user_id and entry[1] > timezone.now()
+
+
+def store_refresh_token(user_id, token):
+    expired_at = timezone.now() + REFRESH_TOKEN_LIFETIME
+    token_hash = hash_token(token)
+    UserToken.objects.create(user_id=user_id, token_hash=token_hash, expired_at=expired_at)
+    token_cache.set(token_hash, (user_id, expired_at))
+
+
+async def astore_refresh_token(user_id, token):
+    expired_at = timezone.now() + REFRESH_TOKEN_LIFETIME
+    token_hash = hash_token(token)
+    await UserToken.objects.acreate(user_id=user_id, token_hash=token_hash, expired_at=expired_at)
+    token_cache.set(token_hash, (user_id, expired_at))
+
+
+def refresh_token_valid(user_id, token):
+    """True if `token` is stored for this user and not expired or revoked."""
+    token_hash = hash_token(token)
+    entry = token_cache.get(token_hash, _UNCACHED)
+    if entry is _UNCACHED:
+        entry = UserToken.objects.filter(token_hash=token_hash).values_list("user_id", "expired_at").first()
+        token_cache.set(token_hash, entry)
+    return _check(entry, user_id)
+
+
+async def arefresh_token_valid(user_id, token):
+    token_hash = hash_token(token)
+    entry = token_cache.get(token_hash, _UNCACHED)
+    if entry is _UNCACHED:
+        entry = await UserToken.objects.filter(token_hash=token_hash).values_list("user_id", "expired_at").afirst()
+        token_cache.set(token_hash, entry)
+    return _check(entry, user_id)
+
+
+def revoke_refresh_token(token):
+    token_hash = hash_token(token)
+    UserToken.objects.filter(token_hash=token_hash).delete()
+    token_cache.set(token_hash, None)
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded per-process LRU whose entries expire. Size and TTL are read from
+    the named settings on every write, so override_settings applies; a size
+    or TTL of 0 turns the cache off.
+    """
+
+    def __init__(self, size_setting, ttl_setting):
+        self.size_setting = size_setting
+        self.ttl_setting = ttl_setting
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        size, ttl = getattr(settings, self.size_setting), getattr(settings, self.ttl_setting)
+        if size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,15 +1,25 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path
 from .views import RegisterAPIView, LoginAPIView, UserAPIView, RefreshAPIView, LogoutAPIView, ForgotAPIView, ResetAPIView, GoogleAuthAPIView, apple_auth_view
+from .async_views import LoginAsyncView, RefreshAsyncView, GoogleAuthAsyncView, apple_auth_async_view
+
+# ASYNC_VIEWS: native async views for ASGI deployments
+if settings.ASYNC_VIEWS:
+    login_view, refresh_view = LoginAsyncView.as_view(), RefreshAsyncView.as_view()
+    google_auth_view, apple_view = GoogleAuthAsyncView.as_view(), apple_auth_async_view
+else:
+    login_view, refresh_view = LoginAPIView.as_view(), RefreshAPIView.as_view()
+    google_auth_view, apple_view = GoogleAuthAPIView.as_view(), apple_auth_view
 
 
 urlpatterns = [
     path('register', RegisterAPIView.as_view()),
-    path('login', LoginAPIView.as_view()),
+    path('login', login_view),
     path('user', UserAPIView.as_view()),
-    path('refresh', RefreshAPIView.as_view()),
+    path('refresh', refresh_view),
     path('logout', LogoutAPIView.as_view()),
     path('forgot', ForgotAPIView.as_view()),
     path('reset', ResetAPIView.as_view()),
-    path('google-auth', GoogleAuthAPIView.as_view()),
-    path("apple-auth", apple_auth_view, name="apple-auth"),
+    path('google-auth', google_auth_view),
+    path("apple-auth", apple_view, name="apple-auth"),
 ]
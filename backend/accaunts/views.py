@@ -4,23 +4,23 @@ from rest_framework.response import Response
 from rest_framework.authentication import get_authorization_header
 from rest_framework import exceptions
 from .serializers import UserSerializer
-from .models import User, UserToken, Reset
-from .authentication import create_access_token, JWTAuthentication, create_refresh_token, decode_refresh_token
-import datetime, random, string
+from .models import User, Reset
+from .authentication import create_access_token, JWTAuthentication, create_refresh_token, decode_refresh_token, user_cache
+from .tokens import store_refresh_token, refresh_token_valid, revoke_refresh_token
+import random, string
 from django.core.mail import send_mail
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from google.oauth2 import id_token
 from google.auth.transport.requests import Request
-from django.utils import timezone
 from django.http import JsonResponse
 import json
 from rest_framework.permissions import AllowAny
-import jwt
 import requests
 from decouple import config
 from jose import jwt as jose_jwt # type: ignore
 
+GOOGLE_CLIENT_ID = "9816983038-gs6t478e6vo67af9p4askcdsf4qctomv.apps.googleusercontent.com"
 
 
 class RegisterAPIView(APIView):
@@ -37,11 +37,7 @@ class RegisterAPIView(APIView):
         access_token = create_access_token(user.id)
         refresh_token = create_refresh_token(user.id)
 
-        UserToken.objects.create(
-            user_id=user.id,
-            token=refresh_token,
-            expired_at=timezone.now() + datetime.timedelta(days=7)
-        )
+        store_refresh_token(user.id, refresh_token)
 
         return Response({
             'token': access_token,
@@ -65,11 +61,7 @@ class LoginAPIView(APIView):
         access_token = create_access_token(user.id)
         refresh_token = create_refresh_token(user.id)
 
-        UserToken.objects.create(
-            user_id=user.id,
-            token=refresh_token,
-            expired_at=timezone.now() + datetime.timedelta(days=7)
-        )
+        store_refresh_token(user.id, refresh_token)
 
         return Response({
             'token': access_token,
@@ -103,12 +95,7 @@ class RefreshAPIView(APIView):
             id = decode_refresh_token(refresh_token)
         except Exception as e:
             raise exceptions.AuthenticationFailed('unauthenticated')
-        token_valid = UserToken.objects.filter(
-            user_id=id,
-            token=refresh_token,
-            expired_at__gt=datetime.datetime.now(datetime.timezone.utc)
-        ).exists()
-        if not token_valid:
+        if not refresh_token_valid(id, refresh_token):
             raise exceptions.AuthenticationFailed('unauthenticated')
 
         access_token = create_access_token(id)
@@ -122,7 +109,8 @@ class RefreshAPIView(APIView):
 class LogoutAPIView(APIView):
     def post(self, request):
         refresh_token = request.COOKIES.get('refresh_token') or request.data.get('refresh_token')
-        UserToken.objects.filter(token=refresh_token).delete()
+        if refresh_token:
+            revoke_refresh_token(refresh_token)
 
         return Response({
             'message': 'success'
@@ -167,6 +155,8 @@ class ResetAPIView(APIView):
 
         user.set_password(data['password'])
         user.save()
+        # post_save evicts it as well; explicit so the old password never outlives this request here
+        user_cache.forget(user.id)
 
         return Response({'message': 'success'})
 
@@ -182,7 +172,7 @@ class GoogleAuthAPIView(APIView):
             googleUser = id_token.verify_oauth2_token(
                 token,
                 Request(),
-                "9816983038-gs6t478e6vo67af9p4askcdsf4qctomv.apps.googleusercontent.com"
+                GOOGLE_CLIENT_ID
             )
         except ValueError:
             raise exceptions.AuthenticationFailed('Invalid Google token')
@@ -201,11 +191,7 @@ class GoogleAuthAPIView(APIView):
         access_token = create_access_token(user.id)
         refresh_token = create_refresh_token(user.id)
 
-        UserToken.objects.create(
-            user_id=user.id,
-            token=refresh_token,
-            expired_at=timezone.now() + datetime.timedelta(days=7)
-        )
+        store_refresh_token(user.id, refresh_token)
 
         return Response({
             'token': access_token,
@@ -254,11 +240,7 @@ def apple_auth_view(request):
         access_token = create_access_token(user.id)
         refresh_token = create_refresh_token(user.id)
 
-        UserToken.objects.create(
-            user_id=user.id,
-            token=refresh_token,
-            expired_at=timezone.now() + datetime.timedelta(days=7)
-        )
+        store_refresh_token(user.id, refresh_token)
 
         return JsonResponse({
             "token": access_token,
@@ -0,0 +1,72 @@
+"""
+A small async counterpart of DRF's APIView, for the public endpoints that
+run natively under ASGI (ASYNC_VIEWS). DRF views are sync-only, and under
+an ASGI server each one holds a worker thread for its whole request.
+
+Handlers are `async def` methods. They get a DRF Request (the project's
+parsers, query_params, data) and return plain data, a DRF Response or an
+HttpResponse. APIExceptions become the same JSON error bodies DRF sends.
+There is no authentication, permission or throttling step, so only
+AllowAny endpoints use this.
+"""
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .renderers import FastJSONRenderer
+
+
+class AsyncAPIView(View):
+    renderer = FastJSONRenderer()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # like APIView: token-authenticated JSON API, no session CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        request = Request(request, parsers=[p() for p in api_settings.DEFAULT_PARSER_CLASSES])
+        self.request = request
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+        try:
+            result = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            result = self.handle_exception(exc)
+        return self.finalize(result)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # no authenticator to name in WWW-Authenticate, so DRF answers 403
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        response = exception_handler(exc, {"view": self, "args": self.args, "kwargs": self.kwargs,
+                                           "request": self.request})
+        if response is None:
+            raise exc
+        response.exception = True
+        return response
+
+    def finalize(self, result):
+        if isinstance(result, HttpResponse) and not isinstance(result, Response):
+            return result
+        if isinstance(result, Response):
+            data, code, headers = result.data, result.status_code, result.items()
+        else:
+            data, code, headers = result, status.HTTP_200_OK, ()
+        response = HttpResponse(
+            self.renderer.render(data, renderer_context={"request": self.request}),
+            status=code,
+            content_type=self.renderer.media_type,
+        )
+        for name, value in headers:
+            if name.lower() != "content-type":
+                response[name] = value
+        return response
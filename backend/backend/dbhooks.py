@@ -0,0 +1,35 @@
+"""
+Install a connection.execute_wrapper on every database connection for the
+length of a request (metrics, query budgets).
+
+Connections are per thread. A sync view queries on the request's own
+thread; an async view's ORM calls run in asgiref's thread-sensitive sync
+thread, so the async variant installs and removes the wrapper there.
+"""
+import contextlib
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+
+@contextlib.contextmanager
+def wrap_all_connections(wrapper):
+    with contextlib.ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(wrapper))
+        yield
+
+
+@contextlib.asynccontextmanager
+async def awrap_all_connections(wrapper):
+    stack = contextlib.ExitStack()
+
+    def enter():
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(wrapper))
+
+    await sync_to_async(enter)()
+    try:
+        yield
+    finally:
+        await sync_to_async(stack.close)()
@@ -0,0 +1,157 @@
+"""
+Production media serving for MEDIA_ROOT.
+
+Files go out through FileResponse, so WSGI servers with wsgi.file_wrapper
+(gunicorn, uwsgi) use zero-copy sendfile(). With MEDIA_ACCEL set, the
+front proxy is handed the file instead (nginx X-Accel-Redirect or
+Apache/lighttpd X-Sendfile). Single byte ranges, If-Range, ETag and
+Last-Modified are honoured; content-hashed derivative names are served
+as immutable.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+mimetypes.add_type("image/webp", ".webp")
+
+# listings.images.variant_name(): <name>.<10 hex>.w<width>.<ext>
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{10}\.w\d+\.(?:webp|jpg)$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class _RangeFile:
+    """File object limited to `length` bytes from the current offset."""
+
+    def __init__(self, fh, length):
+        self._fh = fh
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # sendfile() starts at the fd offset and stops at Content-Length
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive, None for "whole file", or "invalid" for a 416."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # multiple ranges or other units: serving the whole file is allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return "invalid"
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "invalid"
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def serve_media(request, path):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404("Not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Not found")
+
+    size = st.st_size
+    etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(st.st_mtime)
+        response["Accept-Ranges"] = "bytes"
+        if HASHED_NAME_RE.search(path):
+            response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response["Cache-Control"] = f"public, max-age={settings.MEDIA_MAX_AGE}"
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    accel = settings.MEDIA_ACCEL
+    if accel:
+        # the proxy does the I/O (and the Range handling) from here on
+        response = HttpResponse(content_type=content_type)
+        if accel == "nginx":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        else:
+            response["X-Sendfile"] = fullpath
+        return finish(response)
+
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and _if_range_matches(request, etag, st.st_mtime):
+        byte_range = _parse_range(range_header, size)
+        if byte_range == "invalid":
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return finish(response)
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = max(end - start + 1, 0)
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+    else:
+        fh = open(fullpath, "rb")
+        if byte_range:
+            fh.seek(start)
+            response = FileResponse(_RangeFile(fh, length), content_type=content_type)
+        else:
+            response = FileResponse(fh, content_type=content_type)
+
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return finish(response)
@@ -0,0 +1,224 @@
+"""
+Prometheus metrics for the API, without a client library.
+
+MetricsMiddleware records, per URL name: request latency, responses by
+status, DB queries (count and time, through connection.execute_wrapper)
+and response bytes. GET /api/_metrics renders them in the Prometheus
+text format. It is only served when METRICS_TOKEN is set, to callers
+sending it as a bearer token.
+
+Under gunicorn every worker keeps its own numbers. With METRICS_DIR set,
+each worker snapshots them to <METRICS_DIR>/<pid>.json (at most every
+METRICS_FLUSH_INTERVAL seconds) and a scrape sums every snapshot, so
+whichever worker answers reports the whole server. Empty the directory
+when the server restarts, as with prometheus_client's multiprocess mode.
+"""
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .dbhooks import awrap_all_connections, wrap_all_connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "api_request_duration_seconds": ("histogram", "Request latency by URL name.", LATENCY_BUCKETS),
+    "api_responses_total": ("counter", "Responses by URL name, method and status.", None),
+    "api_db_queries": ("histogram", "SQL queries per request by URL name.", QUERY_COUNT_BUCKETS),
+    "api_db_query_duration_seconds_total": ("counter", "Time spent in SQL by URL name.", None),
+    "api_response_bytes_total": ("counter", "Response body bytes by URL name.", None),
+}
+
+
+class Registry:
+    """Counters and cumulative histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            # one count per bucket, then sum, then total count
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [0] * len(buckets) + [0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "histograms": [[n, list(l), list(h)] for (n, l), h in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        """Write this worker's snapshot to METRICS_DIR (rate-limited unless forced)."""
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (not force and now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self._flushed_at = now
+        data = json.dumps(self.snapshot())
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w") as fh:
+            fh.write(data)
+        os.replace(tmp, os.path.join(directory, f"{os.getpid()}.json"))
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap.get("counters", ()):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, hist in snap.get("histograms", ()):
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], hist)]
+            else:
+                histograms[key] = list(hist)
+    return counters, histograms
+
+
+def collect():
+    registry.flush(force=True)
+    if not settings.METRICS_DIR:
+        return merge([registry.snapshot()])
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json")):
+        try:
+            with open(path) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            continue  # a worker mid-restart; its numbers come back next scrape
+    return merge(snapshots)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render(counters, histograms):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        for (n, labels), hist in sorted(histograms.items()):
+            if n != name:
+                continue
+            for bound, count in zip(buckets, hist):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with wrap_all_connections(timer):
+            response = self.get_response(request)
+        self.record(request, response, timer, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        async with awrap_all_connections(timer):
+            response = await self.get_response(request)
+        self.record(request, response, timer, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, timer, elapsed):
+        match = getattr(request, "resolver_match", None)
+        # URL names, never raw paths: label cardinality stays fixed
+        view = match.view_name if match is not None else "unmatched"
+        labels = (("method", request.method), ("view", view))
+        registry.observe("api_request_duration_seconds", labels, elapsed)
+        registry.inc("api_responses_total", labels + (("status", str(response.status_code)),))
+        registry.observe("api_db_queries", (("view", view),), timer.count)
+        registry.inc("api_db_query_duration_seconds_total", (("view", view),), timer.seconds)
+        if response.has_header("Content-Length"):
+            size = int(response["Content-Length"])
+        elif not response.streaming:
+            size = len(response.content)
+        else:
+            size = 0  # unknown until streamed
+        registry.inc("api_response_bytes_total", (("view", view),), size)
+        registry.flush()
+
+
+@require_GET
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404("Metrics are disabled.")
+    given = request.META.get("HTTP_AUTHORIZATION", "")
+    if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+        return HttpResponseForbidden("Invalid metrics token.")
+    return HttpResponse(render(*collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
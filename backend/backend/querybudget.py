@@ -0,0 +1,114 @@
+"""
+Per-view SQL query budgets.
+
+    @query_budget(2)                          # any method
+    class FoodItemListView(ListAPIView): ...
+
+    @query_budget({"get": 3, "post": 6})      # per HTTP method
+    @query_budget({"list": 2, "bulk": 5})     # per ViewSet action
+
+QueryBudgetMiddleware counts the queries each request runs (including
+DRF authentication) and, when the view declares a budget and goes over
+it, logs a warning, or raises QueryBudgetExceeded with
+QUERY_BUDGET_STRICT on, which is how the test suite turns an N+1 into
+a failure. Queries against a DatabaseCache table are cache traffic, not
+the view's data access, and are left out of the count.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .dbhooks import awrap_all_connections, wrap_all_connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(budget):
+    """Declare the budget on a view function or class (int, or dict by method/action)."""
+    def decorate(view):
+        view.query_budget = budget
+        return view
+    return decorate
+
+
+def view_budget(view_func, method):
+    budget = getattr(view_func, "query_budget", None)
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if budget is None and view_class is not None:
+        budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        # routers give each ViewSet action its own view function with an actions map
+        actions = getattr(view_func, "actions", None) or {}
+        key = actions.get(method.lower(), method.lower())
+        budget = budget.get(key)
+    return budget
+
+
+# transaction control, not data access (and TestCase adds these around every atomic)
+_UNCOUNTED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+def cache_tables():
+    """Tables behind the configured DatabaseCache backends."""
+    return tuple(
+        options["LOCATION"] for options in settings.CACHES.values()
+        if options["BACKEND"].endswith(".DatabaseCache")
+    )
+
+
+class QueryCounter:
+    def __init__(self, skip_tables=()):
+        self.count = 0
+        self.skip_tables = skip_tables
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(_UNCOUNTED) and not self.on_skipped_table(sql, context["connection"]):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def on_skipped_table(self, sql, connection):
+        return any(connection.ops.quote_name(table) in sql for table in self.skip_tables)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter(cache_tables())
+        with wrap_all_connections(counter):
+            response = self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter(cache_tables())
+        async with awrap_all_connections(counter):
+            response = await self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    def check(self, request, counter):
+        budget = getattr(request, "_query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = "%s %s ran %d queries (budget %d)" % (
+                request.method, request.path, counter.count, budget,
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = view_budget(view_func, request.method)
@@ -0,0 +1,49 @@
+"""
+orjson-backed DRF renderer. orjson is optional: without it these classes
+behave exactly like DRF's stdlib-json JSONRenderer.
+"""
+import decimal
+
+from django.db.models.fields.files import FieldFile
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(obj):
+    """Types orjson doesn't handle natively (it already does UUID/datetime/date/time)."""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, FieldFile):
+        return obj.url if obj else None
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        # orjson only knows indent=2; any requested indent gets that
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            option |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_default, option=option)
+
+        # same strict-javascript-subset escaping as DRF's JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
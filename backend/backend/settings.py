@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     'rest_framework',
     'corsheaders',
@@ -56,7 +57,21 @@ INSTALLED_APPS = [
 CORS_ALLOW_CREDENTIALS = True
 
 
+# accaunts.authentication: per-process cache of JWT-authenticated users;
+# other processes see user changes after at most the TTL (seconds)
+AUTH_USER_CACHE_SIZE = config("AUTH_USER_CACHE_SIZE", default=10_000, cast=int)
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=30, cast=int)
+# accaunts.tokens: per-process cache of refresh-token checks; a logout in one
+# process is honoured by the others after at most the TTL (seconds)
+REFRESH_TOKEN_CACHE_SIZE = config("REFRESH_TOKEN_CACHE_SIZE", default=10_000, cast=int)
+REFRESH_TOKEN_CACHE_TTL = config("REFRESH_TOKEN_CACHE_TTL", default=10, cast=int)
+
+# serve the hot public endpoints (listings, login/refresh/social auth) with
+# native async views; turn on when running under ASGI (uvicorn backend.asgi:application)
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
 MIDDLEWARE = [
+    "backend.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -65,8 +80,19 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "backend.querybudget.QueryBudgetMiddleware",
 ]
 
+# views declare budgets with backend.querybudget.query_budget; over budget
+# is a warning, or an exception when strict (the test suite turns it on)
+QUERY_BUDGET_STRICT = config("QUERY_BUDGET_STRICT", default=False, cast=bool)
+
+# backend.metrics: /api/_metrics is only served with a token (sent as "Bearer <token>").
+# METRICS_DIR is a directory shared by all gunicorn workers for aggregation.
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_DIR = config("METRICS_DIR", default="")
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=1.0, cast=float)  # seconds
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -150,9 +176,40 @@ AUTH_USER_MODEL = 'accaunts.User'
 EMAIL_HOST = '0.0.0.0'
 EMAIL_PORT = 1025
 
+# Cache backend is pluggable: locmem for a single process, file or DB
+# (django.core.cache.backends.filebased.FileBasedCache /
+# django.core.cache.backends.db.DatabaseCache) when several workers must
+# share the listings catalog version.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="app-cache"),
+    }
+}
+
+LISTINGS_CACHE_ALIAS = "default"
+LISTINGS_CACHE_TIMEOUT = config("LISTINGS_CACHE_TIMEOUT", default=60, cast=int)  # seconds, 0 disables
+LISTINGS_ITEM_CACHE_TIMEOUT = config("LISTINGS_ITEM_CACHE_TIMEOUT", default=300, cast=int)  # detail payloads
+LISTINGS_CACHE_GRID_DEG = config("LISTINGS_CACHE_GRID_DEG", default=0.005, cast=float)  # ~500m lat/lng snap of the cache key
+
+# listings.flashsale: reservations for FoodItem.flash_sale items are batched per process
+FLASH_SALE_BATCH_WINDOW_MS = config("FLASH_SALE_BATCH_WINDOW_MS", default=2, cast=float)  # leader waits for followers
+FLASH_SALE_MAX_BATCH = config("FLASH_SALE_MAX_BATCH", default=500, cast=int)
+FLASH_SALE_STOCK_TTL = config("FLASH_SALE_STOCK_TTL", default=5, cast=float)  # seconds a sold-out verdict is trusted
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# backend.media.serve_media: "" streams via sendfile from the app server,
+# "nginx" hands off with X-Accel-Redirect (internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT), "sendfile" uses X-Sendfile.
+MEDIA_ACCEL = config("MEDIA_ACCEL", default="")
+MEDIA_ACCEL_PREFIX = config("MEDIA_ACCEL_PREFIX", default="/protected-media/")
+MEDIA_MAX_AGE = config("MEDIA_MAX_AGE", default=86400, cast=int)  # originals; hashed variants are immutable
+
+# pixel widths of the WebP/JPEG derivatives generated for uploaded images
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1024)
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -160,7 +217,17 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    # orjson-backed when installed, stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'backend.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 CSRF_TRUSTED_ORIGINS = [
@@ -16,12 +16,16 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
 from django.conf import settings
 
+from .media import serve_media
+from .metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/_metrics", metrics_view, name="metrics"),
     path('api/', include('accaunts.urls')),
     path("api/", include("listings.urls")),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(r"^%s(?P<path>.+)$" % settings.MEDIA_URL.lstrip("/"), serve_media, name="media"),
+]
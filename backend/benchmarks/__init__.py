@@ -0,0 +1,8 @@
+"""
+Standalone performance benchmarks. Run from backend/, e.g.
+
+    python -m benchmarks.nearby --stores 100000
+
+Each benchmark builds a throwaway test database, so it never touches
+the configured one.
+"""
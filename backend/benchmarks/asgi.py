@@ -0,0 +1,175 @@
+"""
+Concurrent-connection capacity: uvicorn with ASYNC_VIEWS on, against the
+WSGI deployment (gunicorn, threaded workers).
+
+    python -m benchmarks.asgi --levels 16,64,256,1024 --duration 10
+    python -m benchmarks.asgi --servers wsgi --threads 16
+
+Each server is started in turn against the configured database, so seed it
+first (manage.py seed_catalog). An asyncio client (stdlib only) then holds
+N keep-alive connections for each N in --levels, every one sending
+GET /api/fooditems/ or /api/fooditems/<id>/ back to back, and the run
+reports throughput, latency percentiles and failures (connect errors,
+timeouts, 5xx) per level. With async views each in-flight request still
+opens its own database connection: keep the levels under PostgreSQL's
+max_connections or put pgbouncer in front.
+
+Needs uvicorn and gunicorn installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from .common import summarize
+
+SERVERS = {
+    "asgi": lambda a: [
+        sys.executable, "-m", "uvicorn", "backend.asgi:application",
+        "--host", a.host, "--port", str(a.port), "--workers", str(a.workers),
+        "--no-access-log", "--log-level", "warning",
+    ],
+    "wsgi": lambda a: [
+        sys.executable, "-m", "gunicorn", "backend.wsgi:application",
+        "--bind", f"{a.host}:{a.port}", "--workers", str(a.workers),
+        "--worker-class", "gthread", "--threads", str(a.threads),
+        "--keep-alive", "30", "--log-level", "warning",
+    ],
+}
+
+
+def start_server(name, args):
+    env = {**os.environ, "ASYNC_VIEWS": "true" if name == "asgi" else "false"}
+    proc = subprocess.Popen(SERVERS[name](args), env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{name} server exited with {proc.returncode}")
+        try:
+            socket.create_connection((args.host, args.port), timeout=0.5).close()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"{name} server did not start listening within 30s")
+
+
+async def read_response(reader):
+    """(status, body) of one HTTP/1.1 response; Content-Length or chunked."""
+    status = int((await reader.readline()).split()[1])
+    length, chunked = None, False
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        body = b""
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            body += await reader.readexactly(size)
+            await reader.readline()
+        await reader.readline()
+        return status, body
+    return status, await reader.readexactly(length or 0)
+
+
+async def connection(args, paths, rng, stop_at, samples, failures):
+    list_paths, detail_paths = paths
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(args.host, args.port), args.timeout)
+    except (OSError, asyncio.TimeoutError):
+        failures["connect"] += 1
+        return
+    try:
+        while time.monotonic() < stop_at:
+            path = rng.choice(detail_paths if rng.random() < args.detail_share else list_paths)
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {args.host}\r\nAccept: application/json\r\n\r\n".encode())
+            try:
+                status, _ = await asyncio.wait_for(read_response(reader), args.timeout)
+            except asyncio.TimeoutError:
+                failures["timeout"] += 1
+                return
+            if status >= 500:
+                failures["5xx"] += 1
+            else:
+                samples.append((time.perf_counter() - start) * 1000.0)
+    except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+        failures["dropped"] += 1
+    finally:
+        writer.close()
+
+
+async def fetch_paths(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(f"GET /api/fooditems/?page_size=100 HTTP/1.1\r\nHost: {args.host}\r\n\r\n".encode())
+    _, body = await read_response(reader)
+    writer.close()
+    item_ids = [row["item_id"] for row in json.loads(body)["results"]]
+    if not item_ids:
+        raise SystemExit("No live items; seed the database first (manage.py seed_catalog).")
+    list_paths = ["/api/fooditems/", "/api/fooditems/?category=meals", "/api/fooditems/?category=pastries"]
+    return list_paths, [f"/api/fooditems/{item_id}/" for item_id in item_ids]
+
+
+async def run_level(args, paths, n):
+    samples, failures = [], {"connect": 0, "timeout": 0, "dropped": 0, "5xx": 0}
+    stop_at = time.monotonic() + args.duration
+    began = time.perf_counter()
+    await asyncio.gather(*(
+        connection(args, paths, random.Random(args.seed * 10_000 + i), stop_at, samples, failures)
+        for i in range(n)
+    ))
+    elapsed = time.perf_counter() - began
+    return {
+        **summarize(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", default="asgi,wsgi")
+    parser.add_argument("--levels", default="16,64,256,1024", help="concurrent connections per step")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--workers", type=int, default=2, help="server processes, both servers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--detail-share", type=float, default=0.3)
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request client timeout")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON here")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.levels.split(",")]
+    results = {"params": vars(args), "servers": {}}
+    for name in args.servers.split(","):
+        proc = start_server(name, args)
+        try:
+            paths = asyncio.run(fetch_paths(args))
+            runs = results["servers"][name] = {}
+            for n in levels:
+                runs[str(n)] = row = asyncio.run(run_level(args, paths, n))
+                failed = sum(row["failures"].values())
+                print(f"{name:<5} {n:>5} conns  {row['throughput_rps']:>8} req/s  "
+                      f"p50 {row['p50_ms']:>8}ms  p99 {row['p99_ms']:>8}ms  failed {failed}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Synthetic catalog shared by the benchmarks: stores clustered around a few
+cities, items spread over every FoodItem category, and shoppers.
+Deterministic for a given random.Random seed.
+"""
+import datetime
+import decimal
+
+CITIES = [
+    ("Almaty", 43.2389, 76.8897),
+    ("Astana", 51.1605, 71.4704),
+    ("Vancouver", 49.2827, -123.1207),
+    ("Toronto", 43.6532, -79.3832),
+    ("Berlin", 52.5200, 13.4050),
+]
+
+STORE_KINDS = ["Bakery", "Cafe", "Market", "Deli", "Kitchen", "Grocer", "Bistro"]
+
+TITLE_WORDS = {
+    "meals": ["Lunch box", "Pasta tray", "Curry bowl", "Plov portion", "Sushi set", "Salad bowl"],
+    "pastries": ["Croissant box", "Bagel bag", "Muffin mix", "Cinnamon rolls", "Baursak bag", "Danish duo"],
+    "groceries": ["Veggie crate", "Fruit bag", "Dairy bundle", "Bread loaf", "Cheese pack", "Egg tray"],
+    "drinks": ["Smoothie pair", "Cold brew", "Kefir bottles", "Juice pack", "Lemonade jug", "Iced tea"],
+    "snacks": ["Cookie jar", "Granola bars", "Chips bundle", "Nut mix", "Brownie bites", "Samsa duo"],
+}
+
+# search terms the load test sends as ?q=, prefixes included
+SEARCH_TERMS = sorted({w.lower() for titles in TITLE_WORDS.values() for t in titles for w in t.split()}) + [
+    "crois", "muff", "bak", "veg", "sush",
+]
+
+
+def seed(n_stores, items_per_store, n_users, rng, batch=5000):
+    """Bulk-insert the catalog; returns the shoppers and (pk, item_id) pairs."""
+    from django.contrib.auth import get_user_model
+    from listings.geo import encode_geohash
+    from listings.models import FoodItem, Store
+    from listings.search import update_search_vector
+
+    User = get_user_model()
+    owner = User.objects.create_user(email="bench-owner@example.com", password="x")
+    users = User.objects.bulk_create([
+        User(email=f"bench-shopper-{i}@example.com", password="!")
+        for i in range(n_users)
+    ])
+    categories = [key for key, _ in FoodItem.CATEGORY_CHOICES]
+    # tomorrow, so every seeded item is still live whenever the run happens
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+
+    for start in range(0, n_stores, batch):
+        stores = []
+        for i in range(start, min(start + batch, n_stores)):
+            city, lat, lng = CITIES[i % len(CITIES)]
+            # ~15km spread around each city centre
+            s_lat = lat + rng.gauss(0, 0.135)
+            s_lng = lng + rng.gauss(0, 0.2)
+            stores.append(Store(
+                owner=owner, name=f"{rng.choice(STORE_KINDS)} {i}", address=f"{i} Main St",
+                city=city, latitude=s_lat, longitude=s_lng, geohash=encode_geohash(s_lat, s_lng),
+            ))
+        stores = Store.objects.bulk_create(stores)
+
+        items = []
+        for s in stores:
+            for _ in range(items_per_store):
+                category = rng.choice(categories)
+                before = decimal.Decimal(rng.randrange(500, 3000)) / 100
+                items.append(FoodItem(
+                    title=rng.choice(TITLE_WORDS[category]), store=s, category=category,
+                    image="food_items/bench.jpg", address=s.address, pickup_date=tomorrow,
+                    pickup_start=datetime.time(17, 0), pickup_end=datetime.time(21, 0),
+                    description=f"Surplus {category} from {s.name}",
+                    available_quantity=rng.choice([0, 1, 2, 3, 5, 8, 20]),
+                    price_before=before, price=(before * decimal.Decimal("0.4")).quantize(decimal.Decimal("0.01")),
+                    rating=round(rng.uniform(3, 5), 1), rating_count=rng.randrange(0, 500),
+                ))
+        FoodItem.objects.bulk_create(items, batch_size=batch)
+
+    # bulk_create skips the signals that normally maintain it
+    update_search_vector(FoodItem.objects.all())
+    return users, list(FoodItem.objects.values_list("pk", "item_id").order_by("pk"))
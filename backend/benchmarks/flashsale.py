@@ -0,0 +1,123 @@
+"""
+Hot-item reservations: row-lock contention vs flash-sale batched admission.
+
+    python -m benchmarks.flashsale --threads 64 --requests 5000 --stock 500
+
+Every thread posts single-unit reservations for the same item through the
+full DRF stack. Meant for PostgreSQL; on SQLite writers serialize on the
+whole database file, so the numbers say little.
+"""
+import argparse
+import datetime
+import json
+import threading
+import time
+
+from .common import setup_django, test_database, summarize
+
+
+def seed(threads, stock, flash_sale):
+    from django.contrib.auth import get_user_model
+    from listings.models import Store, FoodItem
+
+    User = get_user_model()
+    tag = "flash" if flash_sale else "plain"
+    users = [
+        User.objects.create_user(email=f"bench-{tag}-{i}@example.com", password="x")
+        for i in range(threads)
+    ]
+    store = Store.objects.create(
+        owner=users[0], name=f"Hot bakery ({tag})", address="1 Main St", city="Almaty",
+        latitude=43.2389, longitude=76.8897,
+    )
+    item = FoodItem.objects.create(
+        title="End-of-day pastries", store=store, image="food_items/bench.jpg",
+        address=store.address, pickup_date=datetime.date.today(),
+        pickup_start=datetime.time(17, 0), pickup_end=datetime.time(20, 0),
+        description="", available_quantity=stock, flash_sale=flash_sale,
+        price_before="10.00", price="4.00", category="pastries",
+    )
+    return users, item
+
+
+def run(users, item, per_thread):
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(users) + 1)
+
+    def worker(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        mine, codes = [], []
+        barrier.wait()
+        try:
+            for _ in range(per_thread):
+                start = time.perf_counter()
+                response = client.post(
+                    "/api/reservations/", {"food_item": item.pk, "quantity": 1}, format="json"
+                )
+                mine.append((time.perf_counter() - start) * 1000.0)
+                codes.append(response.status_code)
+        finally:
+            connections.close_all()
+            with lock:
+                latencies.extend(mine)
+                statuses.extend(codes)
+
+    threads = [threading.Thread(target=worker, args=(u,)) for u in users]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    began = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stock", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from listings.models import Reservation
+
+    settings.LISTINGS_CACHE_TIMEOUT = 0
+    per_thread = max(args.requests // args.threads, 1)
+
+    results = {}
+    with test_database():
+        for mode, flash_sale in (("row_lock", False), ("batched", True)):
+            users, item = seed(args.threads, args.stock, flash_sale)
+            latencies, statuses, elapsed = run(users, item, per_thread)
+
+            item.refresh_from_db()
+            reserved = Reservation.objects.filter(food_item=item).count()
+            # the point of both modes: never sell more than the stock
+            assert reserved == statuses.count(201) <= args.stock
+            assert item.available_quantity == args.stock - reserved
+
+            results[mode] = {
+                **summarize(latencies),
+                "throughput_rps": round(len(statuses) / elapsed, 1),
+                "reserved": reserved,
+                "rejected": len(statuses) - reserved,
+                "status_counts": {str(c): statuses.count(c) for c in sorted(set(statuses))},
+            }
+
+    results["throughput_speedup"] = round(
+        results["batched"]["throughput_rps"] / max(results["row_lock"]["throughput_rps"], 1e-9), 2
+    )
+    results["params"] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Mixed-traffic load test of the listings API, written to a JSON results file.
+
+    python -m benchmarks.loadtest --stores 2000 --requests 5000 --concurrency 8
+    python -m benchmarks.loadtest --compare benchmarks/results/loadtest-<sha>.json
+
+Requests go through the full Django/DRF stack in-process (no network),
+from --concurrency threads, each with its own shopper. The catalog and the
+request sequence depend only on --seed, so two commits run with the same
+arguments see the same traffic and their result files can be compared.
+Listing caches are off unless --cache is given, so the numbers measure
+the query path. Shoppers are force-authenticated: access tokens live for
+20 seconds, shorter than a long run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+
+from .catalog import CITIES, SEARCH_TERMS, seed
+from .common import setup_django, test_database, summarize
+
+# name -> share of the traffic
+MIX = {
+    "browse": 20,
+    "browse_next_page": 5,
+    "category": 12,
+    "search": 12,
+    "nearby": 18,
+    "nearby_category": 8,
+    "detail": 8,
+    "reserve": 5,
+    "cart_bulk": 6,
+    "cart_list": 6,
+}
+
+
+def _nearby_params(rng):
+    _, lat, lng = rng.choice(CITIES)
+    return {
+        "lat": round(lat + rng.gauss(0, 0.1), 5),
+        "lng": round(lng + rng.gauss(0, 0.15), 5),
+        "max_distance_km": rng.choice([2, 5, 10, 25]),
+    }
+
+
+def build_request(name, rng, ctx):
+    """(method, url, data) for one request of scenario `name`."""
+    categories = ctx["categories"]
+    if name == "browse":
+        return "get", "/api/fooditems/", {}
+    if name == "browse_next_page":
+        return "next", "/api/fooditems/", {}
+    if name == "category":
+        return "get", "/api/fooditems/", {"category": rng.choice(categories)}
+    if name == "search":
+        return "get", "/api/fooditems/", {"q": rng.choice(SEARCH_TERMS)}
+    if name == "nearby":
+        return "get", "/api/fooditems/", _nearby_params(rng)
+    if name == "nearby_category":
+        return "get", "/api/fooditems/", {**_nearby_params(rng), "category": rng.choice(categories)}
+    if name == "detail":
+        return "get", f"/api/fooditems/{rng.choice(ctx['items'])[1]}/", {}
+    if name == "reserve":
+        return "post", "/api/reservations/", {"food_item": rng.choice(ctx["items"])[0], "quantity": 1}
+    if name == "cart_bulk":
+        picks = rng.sample(ctx["items"], k=min(rng.randint(1, 5), len(ctx["items"])))
+        return "post", "/api/cart/bulk/", [
+            {"item_id": str(item_id), "quantity": rng.randint(0, 3)} for _, item_id in picks
+        ]
+    if name == "cart_list":
+        return "get", "/api/cart/", {}
+    raise ValueError(name)
+
+
+def worker(user, n, rng, ctx, samples, lock, barrier, own_thread=True):
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    names, weights = list(MIX), list(MIX.values())
+    mine = []
+    barrier.wait()
+    try:
+        for _ in range(n):
+            name = rng.choices(names, weights)[0]
+            method, url, data = build_request(name, rng, ctx)
+            if method == "next":
+                # only the cursor follow is timed
+                first = client.get(url, data).json()
+                if not first.get("next"):
+                    continue
+                method, url, data = "get", first["next"], {}
+            start = time.perf_counter()
+            if method == "get":
+                response = client.get(url, data)
+            else:
+                response = client.post(url, data, format="json")
+            mine.append((name, (time.perf_counter() - start) * 1000.0, response.status_code))
+    finally:
+        if own_thread:
+            connections.close_all()
+        with lock:
+            samples.extend(mine)
+
+
+def git_commit():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return sha + ("-dirty" if dirty else "")
+
+
+def compare(results, baseline, threshold):
+    """Print p50/p95/p99 change per scenario; returns the regressed ones."""
+    regressed = []
+    print(f"{'scenario':<20}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (current[key] - before[key]) / max(before[key], 1e-9)
+            cells.append(f"{change:+.0%}")
+            if key == "p95_ms" and change > threshold:
+                regressed.append(name)
+        print(f"{name:<20}" + "".join(f"{c:>10}" for c in cells))
+    print(f"throughput: {baseline['overall']['throughput_rps']} -> {results['overall']['throughput_rps']} req/s")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=2000)
+    parser.add_argument("--items-per-store", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache", action="store_true", help="keep the listing caches on")
+    parser.add_argument("--output", help="results file (default benchmarks/results/loadtest-<commit>.json)")
+    parser.add_argument("--compare", help="baseline results file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 growth counted as a regression")
+    args = parser.parse_args()
+
+    setup_django()
+    from django import get_version
+    from django.conf import settings
+    from listings.models import FoodItem
+
+    settings.QUERY_BUDGET_STRICT = False
+    if not args.cache:
+        settings.LISTINGS_CACHE_TIMEOUT = 0
+        settings.LISTINGS_ITEM_CACHE_TIMEOUT = 0
+
+    rng = random.Random(args.seed)
+    with test_database() as connection:
+        users, items = seed(args.stores, args.items_per_store, args.concurrency, rng)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("ANALYZE")
+        ctx = {"items": items, "categories": [key for key, _ in FoodItem.CATEGORY_CHOICES]}
+
+        warm = random.Random(args.seed + 1)
+        scratch = []
+        worker(users[0], args.warmup, warm, ctx, scratch, threading.Lock(), threading.Barrier(1), own_thread=False)
+
+        samples, lock = [], threading.Lock()
+        barrier = threading.Barrier(args.concurrency + 1)
+        per_thread = max(args.requests // args.concurrency, 1)
+        threads = [
+            threading.Thread(target=worker, args=(
+                user, per_thread, random.Random(args.seed * 1000 + i), ctx, samples, lock, barrier,
+            ))
+            for i, user in enumerate(users)
+        ]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        began = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+        vendor = connection.vendor
+
+    scenarios = {}
+    for name in MIX:
+        rows = [(ms, status) for n, ms, status in samples if n == name]
+        if not rows:
+            continue
+        statuses = [status for _, status in rows]
+        scenarios[name] = {
+            **summarize([ms for ms, _ in rows]),
+            "status_counts": {str(s): statuses.count(s) for s in sorted(set(statuses))},
+        }
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": get_version(),
+            "database": vendor,
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "overall": {
+            **summarize([ms for _, ms, _ in samples]),
+            "throughput_rps": round(len(samples) / elapsed, 1),
+            "elapsed_s": round(elapsed, 3),
+        },
+        "scenarios": scenarios,
+    }
+
+    output = args.output or os.path.join("benchmarks", "results", f"loadtest-{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+    print(json.dumps(results["overall"], indent=2))
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            raise SystemExit(f"p95 regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
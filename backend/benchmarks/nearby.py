@@ -0,0 +1,121 @@
+"""
+Nearest-store search: full great-circle scan vs geohash/box prefilter.
+
+    python -m benchmarks.nearby --stores 100000 --queries 300 --radius 5
+"""
+import argparse
+import datetime
+import json
+import random
+
+from .catalog import CITIES
+from .common import setup_django, test_database, timed, summarize
+
+
+def seed(n_stores, rng):
+    from django.contrib.auth import get_user_model
+    from listings.geo import encode_geohash
+    from listings.models import Store, FoodItem
+
+    owner = get_user_model().objects.create_user(email="bench@example.com", password="x")
+    # tomorrow, so the list view's live-window filter keeps every item
+    pickup_date = datetime.date.today() + datetime.timedelta(days=1)
+
+    for start in range(0, n_stores, 5000):
+        stores = []
+        for i in range(start, min(start + 5000, n_stores)):
+            city, lat, lng = CITIES[i % len(CITIES)]
+            # ~15km spread around each city centre
+            s_lat = lat + rng.gauss(0, 0.135)
+            s_lng = lng + rng.gauss(0, 0.2)
+            stores.append(Store(
+                owner=owner, name=f"Store {i}", address=f"{i} Main St", city=city,
+                latitude=s_lat, longitude=s_lng, geohash=encode_geohash(s_lat, s_lng),
+            ))
+        stores = Store.objects.bulk_create(stores)
+        FoodItem.objects.bulk_create([
+            FoodItem(
+                title=f"Item {s.name}", store=s, image="food_items/bench.jpg",
+                address=s.address, pickup_date=pickup_date,
+                pickup_start=datetime.time(17, 0), pickup_end=datetime.time(20, 0),
+                description="", available_quantity=3,
+                price_before="10.00", price="4.00",
+            )
+            for s in stores
+        ])
+
+
+def legacy_queryset(lat, lng, km):
+    from listings.geo import distance_expression
+    from listings.models import FoodItem
+
+    return (FoodItem.objects
+            .filter(available_quantity__gt=0)
+            .select_related("store")
+            .annotate(distance_km=distance_expression(lat, lng))
+            .filter(distance_km__lte=km)
+            .order_by("distance_km", "-created_at"))
+
+
+def prefiltered_queryset(lat, lng, km):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from listings.views import FoodItemListView
+
+    view = FoodItemListView()
+    view.request = Request(APIRequestFactory().get(
+        "/api/fooditems/", {"lat": lat, "lng": lng, "max_distance_km": km}
+    ))
+    return view.get_queryset()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--radius", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    rng = random.Random(args.seed)
+
+    with test_database() as connection:
+        seed(args.stores, rng)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("ANALYZE")
+
+        points = []
+        for _ in range(args.queries):
+            _, lat, lng = rng.choice(CITIES)
+            points.append((lat + rng.gauss(0, 0.1), lng + rng.gauss(0, 0.15)))
+
+        results = {}
+        for name, build in (("legacy", legacy_queryset), ("prefilter", prefiltered_queryset)):
+            # warm-up: imports, statement caches
+            list(build(*points[0], args.radius).values_list("id", flat=True))
+            it = iter(points)
+
+            def run():
+                lat, lng = next(it)
+                list(build(lat, lng, args.radius).values_list("id", flat=True))
+
+            results[name] = summarize(timed(run, len(points)))
+
+        # both paths must return the same rows
+        lat, lng = points[0]
+        assert (
+            set(legacy_queryset(lat, lng, args.radius).values_list("id", flat=True))
+            == set(prefiltered_queryset(lat, lng, args.radius).values_list("id", flat=True))
+        )
+
+        results["p99_speedup"] = round(
+            results["legacy"]["p99_ms"] / max(results["prefilter"]["p99_ms"], 1e-9), 2
+        )
+        results["params"] = vars(args)
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Render 10k serialized FoodItems with DRF's JSONRenderer and FastJSONRenderer.
+
+    python -m benchmarks.renderers --items 10000 --repeat 20
+"""
+import argparse
+import datetime
+import decimal
+import json
+import uuid
+
+from .common import setup_django, timed, summarize
+
+
+def build_payload(n):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from listings.models import FoodItem, Store
+    from listings.serializers import FoodItemSerializer
+
+    store = Store(id=1, name="Bench Bakery", address="1 Main St", city="Almaty")
+    items = []
+    for i in range(n):
+        item = FoodItem(
+            id=i + 1, item_id=uuid.uuid4(), title=f"Surprise bag {i}", store=store,
+            image=f"food_items/bench-{i}.jpg", rating=4.5, rating_count=i,
+            address="1 Main St", pickup_date=datetime.date.today(),
+            pickup_start=datetime.time(17, 0), pickup_end=datetime.time(20, 30),
+            description="", available_quantity=3,
+            price_before=decimal.Decimal("12.50"), price=decimal.Decimal("4.99"),
+        )
+        item.distance_km = 1.0 + i / 1000
+        items.append(item)
+
+    request = Request(APIRequestFactory().get("/api/fooditems/"))
+    return FoodItemSerializer(items, many=True, context={"request": request}).data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from backend.renderers import FastJSONRenderer, orjson
+
+    data = build_payload(args.items)
+    results = {}
+    for name, renderer in (("drf_json", JSONRenderer()), ("fast_json", FastJSONRenderer())):
+        body = renderer.render(data)
+        results[name] = {**summarize(timed(lambda: renderer.render(data), args.repeat)), "bytes": len(body)}
+
+    assert json.loads(JSONRenderer().render(data)) == json.loads(FastJSONRenderer().render(data))
+    results["speedup"] = round(results["drf_json"]["mean_ms"] / max(results["fast_json"]["mean_ms"], 1e-9), 2)
+    results["orjson"] = getattr(orjson, "__version__", None)
+    results["params"] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
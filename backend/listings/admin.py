@@ -14,9 +14,9 @@ class StoreAdmin(admin.ModelAdmin):
 
 @admin.register(FoodItem)
 class FoodItemAdmin(admin.ModelAdmin):
-    list_display = ("title", "store", "available_quantity", "price", "created_at")
-    list_filter  = ("store",)
-    search_fields = ("title", "store__name", "item_id")  # <- needed for autocomplete
+    list_display = ("title", "store", "available_quantity", "price", "flash_sale", "created_at")
+    list_filter  = ("store", "flash_sale")
+    search_fields = ("title", "store__name", "item_id", "sku")  # <- needed for autocomplete
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
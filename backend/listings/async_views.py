@@ -0,0 +1,82 @@
+"""
+Async versions of the public listing endpoints, mounted instead of the DRF
+views when ASYNC_VIEWS is on (ASGI deployments).
+
+They reuse the sync views for everything that doesn't touch the database
+(filter parsing, queryset building, cache keys and entries, serializers,
+ETags), and read rows and cache entries with the async ORM and cache API,
+so a slow query parks a coroutine instead of a worker thread.
+"""
+from django.conf import settings
+from django.http import Http404
+
+from backend.asyncapi import AsyncAPIView
+from backend.querybudget import query_budget
+
+from .cache import aversioned_key, item_payload_key, item_validators_key, listings_cache
+from .views import FoodItemDetailView, FoodItemListView
+
+
+def _sync_view(view_class, request, **kwargs):
+    # a DRF view instance used for its helpers only; it never dispatches
+    return view_class(request=request, args=(), kwargs=kwargs, format_kwarg=None)
+
+
+@query_budget(1)
+class FoodItemListAsyncView(AsyncAPIView):
+    async def get(self, request):
+        view = _sync_view(FoodItemListView, request)
+        paginator = view.paginator
+        cache = listings_cache()
+        timeout = settings.LISTINGS_CACHE_TIMEOUT
+
+        if timeout > 0:
+            key = await aversioned_key("fooditems", view.cache_key_params(request))
+            cached = await cache.aget(key)
+            if cached is not None:
+                return view.cached_page_response(request, cached)
+
+        queryset = view.filter_queryset(view.get_queryset())
+        rows = await paginator.apaginate_queryset(queryset, request, view)
+        results = view.get_serializer(rows, many=True).data
+        if timeout > 0:
+            await cache.aset(key, view.page_cache_entry(results), timeout)
+        return paginator.get_paginated_response(results)
+
+
+@query_budget(1)
+class FoodItemDetailAsyncView(AsyncAPIView):
+    async def get(self, request, item_id):
+        view = _sync_view(FoodItemDetailView, request, item_id=item_id)
+        item_id = str(item_id)
+        host = request.get_host()
+        cache = listings_cache()
+        timeout = settings.LISTINGS_ITEM_CACHE_TIMEOUT
+        variant = view.etag_variant(request)
+
+        validators = await cache.aget(item_validators_key(item_id))
+        if validators is not None:
+            etag = view.etag_for(validators, variant)
+            response = view.not_modified(request, etag, validators)
+            if response is not None:
+                return response
+            data = await cache.aget(item_payload_key(item_id, etag, host))
+            if data is not None:
+                return view.with_validators(self.finalize(data), etag, validators)
+
+        instance = await view.filter_queryset(view.get_queryset()).filter(item_id=item_id).afirst()
+        if instance is None:
+            raise Http404("No FoodItem matches the given query.")
+        view.check_object_permissions(request, instance)
+        validators = view.validators_for(instance)
+        await cache.aset(item_validators_key(item_id), validators, timeout)
+        etag = view.etag_for(validators, variant)
+
+        # answer revalidation before paying for serialization
+        response = view.not_modified(request, etag, validators)
+        if response is not None:
+            return response
+
+        data = view.get_serializer(instance).data
+        await cache.aset(item_payload_key(item_id, etag, host), data, timeout)
+        return view.with_validators(self.finalize(data), etag, validators)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+CATALOG_VERSION_KEY = "listings:catalog-version"
+
+
+def listings_cache():
+    return caches[settings.LISTINGS_CACHE_ALIAS]
+
+
+def catalog_version():
+    cache = listings_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # seeded from the clock so an evicted counter never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def acatalog_version():
+    cache = listings_cache()
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached listing response at once."""
+    cache = listings_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        return cache.get(CATALOG_VERSION_KEY)
+
+
+def round_to_grid(value, grid=None):
+    grid = settings.LISTINGS_CACHE_GRID_DEG if grid is None else grid
+    if value is None or not grid:
+        return value
+    return round(round(value / grid) * grid, 6)
+
+
+def _digest(params):
+    return hashlib.sha1(
+        json.dumps(params, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def versioned_key(prefix, params):
+    return f"{prefix}:{catalog_version()}:{_digest(params)}"
+
+
+async def aversioned_key(prefix, params):
+    return f"{prefix}:{await acatalog_version()}:{_digest(params)}"
+
+
+def item_validators_key(item_id):
+    return f"fooditem:{item_id}"
+
+
+def item_payload_key(item_id, etag, host):
+    # etag in the key: a changed item simply stops hitting its old payload
+    return f"fooditem:{item_id}:{etag}:{host}"
+
+
+def invalidate_items(item_ids):
+    listings_cache().delete_many([item_validators_key(i) for i in item_ids])
@@ -0,0 +1,104 @@
+"""
+Reservation export: flat NDJSON/CSV rows streamed straight off the cursor.
+
+Rows come from values_list(...).iterator(chunk_size=...), which on
+PostgreSQL reads through a server-side cursor, so neither the queryset
+nor any serializer is ever held in memory and the first rows can go out
+before the query has finished. Used by GET /api/reservations/export/ and
+the export_reservations command.
+"""
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Reservation
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# (output column, queryset lookup)
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("reserved_at", "reserved_at"),
+    ("quantity", "quantity"),
+    ("is_collected", "is_collected"),
+    ("user_email", "user__email"),
+    ("item_id", "food_item__item_id"),
+    ("sku", "food_item__sku"),
+    ("title", "food_item__title"),
+    ("price", "food_item__price"),
+    ("store_id", "food_item__store__store_id"),
+    ("store_name", "food_item__store__name"),
+]
+HEADER = [name for name, _ in EXPORT_COLUMNS]
+
+
+def parse_bound(value, end=False):
+    """
+    An aware datetime from an ISO date or datetime string, or None if it
+    doesn't parse. A bare date as the upper bound covers that whole day.
+    """
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        day = None if moment else parse_date(value)
+    except ValueError:  # well-formed but out of range, e.g. 2026-02-30
+        return None
+    if moment is None:
+        if day is None:
+            return None
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(queryset=None, store=None, since=None, until=None):
+    """Flat value rows ordered by pk; `until` is exclusive."""
+    qs = Reservation.objects.all() if queryset is None else queryset
+    if store is not None:
+        qs = qs.filter(food_item__store=store)
+    if since is not None:
+        qs = qs.filter(reserved_at__gte=since)
+    if until is not None:
+        qs = qs.filter(reserved_at__lt=until)
+    return qs.order_by("pk").values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+
+
+def _value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)  # Decimal, UUID
+
+
+class _Line:
+    """File-like sink for csv.writer that hands back what was written."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(rows, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export as text, one line per row (CSV starts with a header)."""
+    rows = rows.iterator(chunk_size=chunk_size)
+    if fmt == "csv":
+        writer = csv.writer(_Line())
+        yield writer.writerow(HEADER)
+        for row in rows:
+            yield writer.writerow([
+                "" if v is None else _value(v) for v in row
+            ])
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(HEADER, map(_value, row)))) + "\n"
@@ -0,0 +1,215 @@
+"""
+Flash-sale admission for hot items (FoodItem.flash_sale).
+
+Concurrent reservations for the same hot item in one process queue up
+behind a leader, which applies them as a batch: one row lock, one UPDATE
+and one bulk INSERT, instead of every request fighting over the row.
+Once the process knows the item is sold out, further requests get a 409
+without touching the database, until FLASH_SALE_STOCK_TTL passes or the
+item is saved again (a restock).
+
+Batching needs several requests in flight per process (gthread or ASGI
+workers); with sync workers each batch is one request, but the sold-out
+short-circuit still applies.
+
+A leader applies one batch, the one holding its own request, then hands
+the lead to the oldest request still queued, so no request waits on more
+than the batches ahead of it plus its own. A queue that goes idle is
+dropped unless it still holds a fresh sold-out verdict.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+
+from .cache import bump_catalog_version, invalidate_items
+from .models import FoodItem, Reservation
+
+
+class SoldOut(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Sold out."
+    default_code = "sold_out"
+
+
+class _Ticket:
+    __slots__ = ("user", "quantity", "wake", "done", "lead", "reservation", "stock_left", "error")
+
+    def __init__(self, user, quantity):
+        self.user = user
+        self.quantity = quantity
+        # set when the ticket is done, or when it is handed the lead
+        self.wake = threading.Event()
+        self.done = False
+        self.lead = False
+        self.reservation = None
+        self.stock_left = None
+        self.error = None
+
+
+class AdmissionQueue:
+    def __init__(self, item_pk, item_id):
+        self.item_pk = item_pk
+        self.item_id = item_id
+        self._lock = threading.Lock()
+        self._pending = []
+        self._flushing = False
+        # stock not yet promised to a queued request; None = ask the DB
+        self._remaining = None
+        self._checked_at = 0.0
+
+    def _known_short(self, quantity):
+        # caller holds self._lock
+        if self._remaining is None or self._remaining >= quantity:
+            return False
+        # an old verdict goes back to the DB in case the store restocked
+        return time.monotonic() - self._checked_at <= settings.FLASH_SALE_STOCK_TTL
+
+    def check(self, quantity):
+        with self._lock:
+            if self._known_short(quantity):
+                raise SoldOut()
+
+    def reset(self):
+        with self._lock:
+            self._remaining = None
+
+    def idle(self):
+        """Nothing queued and no fresh sold-out verdict worth keeping."""
+        with self._lock:
+            return not self._flushing and not self._known_short(1)
+
+    def reserve(self, food_item, user, quantity):
+        ticket = _Ticket(user, quantity)
+        with self._lock:
+            if self._known_short(quantity):
+                raise SoldOut()
+            if self._remaining is not None:
+                self._remaining = max(self._remaining - quantity, 0)
+            self._pending.append(ticket)
+            if not self._flushing:
+                self._flushing = ticket.lead = True
+
+        # only a leader that started the flush waits for followers to join
+        first = ticket.lead
+        while not ticket.done:
+            if ticket.lead:
+                self._drain(wait=first)
+            else:
+                ticket.wake.wait()
+                ticket.wake.clear()
+        if ticket.error is not None:
+            raise ticket.error
+
+        food_item.available_quantity = ticket.stock_left
+        ticket.reservation.food_item = food_item
+        return ticket.reservation
+
+    def _drain(self, wait):
+        """Apply the batch at the head of the queue (the leader's own is in it), then hand over."""
+        window = settings.FLASH_SALE_BATCH_WINDOW_MS / 1000.0
+        if wait and window > 0:
+            time.sleep(window)  # let followers join the first batch
+        limit = max(settings.FLASH_SALE_MAX_BATCH, 1)
+        with self._lock:
+            batch = self._pending[:limit]
+            del self._pending[:limit]
+        try:
+            left = self._apply(batch)
+        except Exception as exc:
+            left = None
+            for ticket in batch:
+                ticket.error = exc
+        with self._lock:
+            if left is None:
+                self._remaining = None
+            else:
+                queued = sum(t.quantity for t in self._pending)
+                self._remaining = max(left - queued, 0)
+                self._checked_at = time.monotonic()
+            if self._pending:
+                self._pending[0].lead = True
+                self._pending[0].wake.set()
+            else:
+                self._flushing = False
+        for ticket in batch:
+            ticket.done = True
+            ticket.wake.set()
+        if not self._flushing:
+            _prune()
+
+    def _apply(self, batch):
+        """Admit what fits, in arrival order; returns the stock left in the DB."""
+        with transaction.atomic():
+            stock = (FoodItem.objects.select_for_update()
+                     .filter(pk=self.item_pk)
+                     .values_list("available_quantity", flat=True)
+                     .first())
+            if stock is None:
+                raise NotFound("Food item no longer exists.")
+
+            admitted, left = [], stock
+            for ticket in batch:
+                if ticket.quantity <= left:
+                    admitted.append(ticket)
+                    left -= ticket.quantity
+                else:
+                    ticket.error = SoldOut()
+
+            if admitted:
+                FoodItem.objects.filter(pk=self.item_pk).update(
+                    available_quantity=left, updated_at=timezone.now()
+                )
+                reservations = Reservation.objects.bulk_create([
+                    Reservation(user=t.user, food_item_id=self.item_pk, quantity=t.quantity)
+                    for t in admitted
+                ])
+                for ticket, reservation in zip(admitted, reservations):
+                    ticket.reservation = reservation
+                item_id = self.item_id
+                transaction.on_commit(bump_catalog_version)
+                transaction.on_commit(lambda: invalidate_items([item_id]))
+
+        for ticket in batch:
+            ticket.stock_left = left
+        return left
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def queue_for(food_item):
+    with _queues_lock:
+        queue = _queues.get(food_item.pk)
+        if queue is None:
+            queue = _queues[food_item.pk] = AdmissionQueue(food_item.pk, food_item.item_id)
+        return queue
+
+
+def _prune():
+    with _queues_lock:
+        for pk in [pk for pk, queue in _queues.items() if queue.idle()]:
+            del _queues[pk]
+
+
+def reject_if_sold_out(item_pk, quantity):
+    """Query-free 409 for a hot item this process already saw sell out."""
+    try:
+        queue = _queues.get(int(item_pk))
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        return
+    if queue is not None:
+        queue.check(quantity)
+
+
+def forget(item_pk):
+    """The item was saved (restock, unflagged...): stop trusting our stock count."""
+    queue = _queues.get(item_pk)
+    if queue is not None:
+        queue.reset()
@@ -0,0 +1,160 @@
+import math
+
+from django.db.models import F, FloatField, ExpressionWrapper, Value, Q
+from django.db.models.functions import ACos, Cos, Sin, Radians, Least, Greatest
+
+EARTH_RADIUS_KM = 6371.0
+
+# 9 chars ~= 4.8m x 4.8m cells, plenty for a store pin
+GEOHASH_PRECISION = 9
+# upper bound on OR'ed prefixes sent to the DB for one search circle
+MAX_COVER_CELLS = 16
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision):
+    """(lat_degrees, lng_degrees) covered by one geohash cell."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_box(lat, lng, km):
+    """
+    Lat/lng box enclosing the circle of radius `km` around (lat, lng).
+    Returns (min_lat, max_lat, lng_ranges); lng_ranges is split in two
+    when the box crosses the antimeridian.
+    """
+    ang = km / EARTH_RADIUS_KM
+    d_lat = math.degrees(ang)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        # circle contains a pole -> every longitude is in play
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    ratio = math.sin(ang) / math.cos(math.radians(lat))
+    if ratio >= 1.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    d_lng = math.degrees(math.asin(ratio))
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+
+    if min_lng < -180.0:
+        return min_lat, max_lat, [(min_lng + 360.0, 180.0), (-180.0, max_lng)]
+    if max_lng > 180.0:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360.0)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+
+def _steps(lo, hi, step):
+    n = int(math.floor((hi - lo) / step)) + 1
+    return [min(lo + i * step, hi) for i in range(n)] + [hi]
+
+
+def covering_prefixes(min_lat, max_lat, lng_ranges, max_cells=MAX_COVER_CELLS):
+    """
+    Smallest-cell set of geohash prefixes that covers the box, using the
+    finest precision that stays within `max_cells`. None if even the
+    coarsest precision needs more cells (caller falls back to the box).
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = _cell_size(precision)
+        rows = math.ceil((max_lat - min_lat) / cell_lat) + 1
+        cols = sum(math.ceil((hi - lo) / cell_lng) + 1 for lo, hi in lng_ranges)
+        if rows * cols > max_cells * 4:
+            continue
+        cells = set()
+        for lo, hi in lng_ranges:
+            for y in _steps(min_lat, max_lat, cell_lat):
+                for x in _steps(lo, hi, cell_lng):
+                    cells.add(encode_geohash(y, x, precision))
+        if len(cells) <= max_cells:
+            return sorted(cells)
+    return None
+
+
+def nearby_q(lat, lng, km, prefix="store__"):
+    """
+    Cheap index-backed prefilter for "within km of (lat, lng)": a geohash
+    prefix cover plus the exact lat/lng box. Rows that pass still need the
+    great-circle check, but only those rows get the trig work.
+    """
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, km)
+
+    q = Q(**{f"{prefix}latitude__range": (min_lat, max_lat)})
+    lng_q = Q()
+    for lo, hi in lng_ranges:
+        lng_q |= Q(**{f"{prefix}longitude__range": (lo, hi)})
+    q &= lng_q
+
+    prefixes = covering_prefixes(min_lat, max_lat, lng_ranges)
+    if prefixes:
+        cell_q = Q()
+        for p in prefixes:
+            cell_q |= Q(**{f"{prefix}geohash__startswith": p})
+        q &= cell_q
+    return q
+
+
+def distance_expression(lat, lng, prefix="store__"):
+    acos_arg = Least(
+        Value(1.0),
+        Greatest(
+            Value(-1.0),
+            Cos(Radians(Value(lat))) * Cos(Radians(F(f"{prefix}latitude"))) *
+            Cos(Radians(F(f"{prefix}longitude") - Value(lng))) +
+            Sin(Radians(Value(lat))) * Sin(Radians(F(f"{prefix}latitude")))
+        ),
+    )
+    return ExpressionWrapper(
+        Value(EARTH_RADIUS_KM) * ACos(acos_arg),
+        output_field=FloatField()
+    )
+
+
+# map clustering: cells per 256px web-mercator tile edge (64px cells)
+CLUSTER_CELLS_PER_TILE = 4
+MAX_CLUSTER_CELLS = 2500
+
+
+def cluster_cell_deg(zoom, min_lat, max_lat, lng_span):
+    """
+    Grid cell edge (degrees) for `zoom`, coarsened if the box would
+    otherwise split into more than MAX_CLUSTER_CELLS cells.
+    """
+    cell = 360.0 / ((1 << zoom) * CLUSTER_CELLS_PER_TILE)
+    while ((max_lat - min_lat) / cell) * (lng_span / cell) > MAX_CLUSTER_CELLS:
+        cell *= 2
+    return cell
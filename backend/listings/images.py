@@ -0,0 +1,156 @@
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# key -> (file extension, Pillow format, save options)
+VARIANT_FORMATS = {
+    "webp": ("webp", "WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_name(name, digest, width, ext):
+    """food_items/x.jpg -> food_items/x.<content hash>.w320.webp (safe to cache forever)"""
+    root, _ = os.path.splitext(name)
+    return f"{root}.{digest}.w{width}.{ext}"
+
+
+def render_variants(name, widths=None, storage=None):
+    """
+    Write fixed-width WebP/JPEG copies of `name` next to it and return the
+    variants map stored on the model:
+        {"src": name, "hash": ..., "webp": {"320": path, ...}, "jpeg": {...}}
+    Never upscales; an image narrower than every width gets one variant at
+    its own width. Existing files are reused, so reruns are cheap.
+    """
+    storage = storage or default_storage
+    widths = sorted(set(widths or settings.IMAGE_VARIANT_WIDTHS))
+
+    with storage.open(name, "rb") as fh:
+        raw = fh.read()
+    digest = hashlib.sha1(raw).hexdigest()[:10]
+
+    result = {"src": name, "hash": digest}
+    for key in VARIANT_FORMATS:
+        result[key] = {}
+
+    with Image.open(io.BytesIO(raw)) as img:
+        # size comes from the header; pixels are only decoded if something is missing
+        width, height = (img.height, img.width) if _is_rotated(img) else img.size
+        targets = [w for w in widths if w < width] or [width]
+        missing = [
+            (w, key) for w in targets for key, (ext, _, _) in VARIANT_FORMATS.items()
+            if not storage.exists(variant_name(name, digest, w, ext))
+        ]
+        if missing:
+            base = ImageOps.exif_transpose(img)
+            has_alpha = "A" in base.getbands() or "transparency" in base.info
+            base = base.convert("RGBA" if has_alpha else "RGB")
+
+    for w in targets:
+        for key, (ext, _, _) in VARIANT_FORMATS.items():
+            result[key][str(w)] = variant_name(name, digest, w, ext)
+
+    resized_cache = {}
+    for w, key in missing:
+        ext, fmt, options = VARIANT_FORMATS[key]
+        if w not in resized_cache:
+            h = max(1, round(height * w / width))
+            resized_cache[w] = base if w == width else base.resize((w, h), Image.LANCZOS)
+        frame = resized_cache[w]
+        if fmt == "JPEG" and frame.mode != "RGB":
+            frame = frame.convert("RGB")
+        buf = io.BytesIO()
+        frame.save(buf, fmt, **options)
+        result[key][str(w)] = storage.save(variant_name(name, digest, w, ext), ContentFile(buf.getvalue()))
+    return result
+
+
+def _is_rotated(img):
+    # EXIF orientations 5-8 swap width and height
+    try:
+        return img.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def refresh_variants(instance, field_name, variants_field):
+    """
+    Regenerate `variants_field` when `field_name` points at a different
+    file than the one the variants were built from. Written with
+    .update() so it doesn't re-trigger post_save.
+
+    A source that can't be rendered is recorded as {"src": name} (no
+    variants), so later saves don't retry it; generate_image_variants
+    does. Files of the replaced variants are deleted after commit unless
+    another row still uses the same source.
+    """
+    image = getattr(instance, field_name)
+    current = getattr(instance, variants_field) or {}
+    if image and current.get("src") == image.name:
+        return current
+    if not image and not current:
+        return current
+
+    variants = {}
+    if image:
+        try:
+            variants = render_variants(image.name)
+        except (OSError, UnidentifiedImageError) as exc:
+            logger.warning("Could not build variants for %s: %s", image.name, exc)
+            variants = {"src": image.name}
+
+    updates = {variants_field: variants}
+    if _files(variants) != _files(current) and hasattr(instance, "updated_at"):
+        # payload changed, so the detail ETag must too
+        updates["updated_at"] = timezone.now()
+    model = type(instance)
+    model.objects.filter(pk=instance.pk).update(**updates)
+    setattr(instance, variants_field, variants)
+
+    stale = set(_files(current).values()) - set(_files(variants).values())
+    if stale and not model.objects.filter(**{field_name: current.get("src")}).exclude(pk=instance.pk).exists():
+        transaction.on_commit(lambda: _delete_files(stale))
+    return variants
+
+
+def _files(variants):
+    """{(format, width): file name} of a stored variants map."""
+    return {
+        (key, width): name
+        for key in VARIANT_FORMATS
+        for width, name in ((variants or {}).get(key) or {}).items()
+    }
+
+
+def _delete_files(names, storage=None):
+    storage = storage or default_storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as exc:
+            logger.warning("Could not delete old variant %s: %s", name, exc)
+
+
+def variant_urls(variants, request=None):
+    """Stored variants map -> {"webp": {"320": url, ...}, "jpeg": {...}} for the API."""
+    if not _files(variants):
+        return None
+    out = {}
+    for key in VARIANT_FORMATS:
+        urls = {}
+        for width, name in (variants.get(key) or {}).items():
+            url = default_storage.url(name)
+            urls[width] = request.build_absolute_uri(url) if request is not None else url
+        out[key] = urls
+    return out
@@ -0,0 +1,186 @@
+"""
+Bulk inventory import: stream CSV/NDJSON rows into a store's FoodItems.
+
+Rows are parsed lazily and validated and written in chunks, so memory
+does not grow with the file. Each chunk is upserted keyed on the store's
+SKU (bulk_create with update_conflicts on (store, sku)): new SKUs become
+items, known SKUs are updated in place and keep their item_id. Optional
+columns (description, address, category) only overwrite an existing item
+when the row gives them. Invalid rows are skipped and reported with their
+line number.
+"""
+import csv
+import io
+import json
+import os
+
+from django.db import transaction
+from rest_framework import serializers
+
+from . import flashsale
+from .cache import bump_catalog_version, invalidate_items
+from .models import FoodItem
+from .search import fts_enabled, update_search_vector
+
+IMPORT_CHUNK_SIZE = 1000
+# the report keeps the first N row errors; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# columns every import row sets, so they are rewritten on an existing item
+UPDATE_FIELDS = [
+    "title", "price", "price_before", "available_quantity",
+    "pickup_date", "pickup_start", "pickup_end", "updated_at",
+]
+# only rewritten when the row gives them; their defaults are for new items
+OPTIONAL_FIELDS = {"description", "address", "category"}
+
+
+class InventoryRowSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    address = serializers.CharField(max_length=255, required=False)
+    category = serializers.ChoiceField(choices=FoodItem.CATEGORY_CHOICES, default="meals")
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0)
+    price_before = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0)
+    available_quantity = serializers.IntegerField(min_value=0)
+    pickup_date = serializers.DateField()
+    pickup_start = serializers.TimeField()
+    pickup_end = serializers.TimeField()
+
+    def validate(self, attrs):
+        if attrs["price"] > attrs["price_before"]:
+            raise serializers.ValidationError({"price": "Must not exceed price_before."})
+        if attrs["pickup_end"] <= attrs["pickup_start"]:
+            raise serializers.ValidationError({"pickup_end": "Must be after pickup_start."})
+        return attrs
+
+
+def detect_format(name, content_type=""):
+    """"csv", "ndjson" or None, from the file extension, then the content type."""
+    ext = os.path.splitext(name or "")[1].lower()
+    return FORMATS.get(ext) or FORMATS.get((content_type or "").split(";")[0].strip().lower())
+
+
+def iter_rows(binary, fmt):
+    """Yield (line number, row dict or None, parse error or None) from a binary file."""
+    text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # blank cells mean "not given", so optional columns get their defaults
+            yield reader.line_num, {
+                k.strip(): v.strip() for k, v in row.items()
+                if k and isinstance(v, str) and v.strip()
+            }, None
+        return
+
+    for line_no, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, {"non_field_errors": [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, {"non_field_errors": ["Expected a JSON object."]}
+            continue
+        yield line_no, row, None
+
+
+class InventoryImport:
+    def __init__(self, store, chunk_size=IMPORT_CHUNK_SIZE, on_error=None):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        chunk = []
+        for line_no, row, error in rows:
+            if error:
+                self.fail(line_no, None, error)
+                continue
+            chunk.append((line_no, row))
+            if len(chunk) >= self.chunk_size:
+                self.apply(chunk)
+                chunk = []
+        if chunk:
+            self.apply(chunk)
+        if self.created or self.updated:
+            bump_catalog_version()
+        return self.report()
+
+    def fail(self, line_no, sku, errors):
+        error = {"row": line_no, "sku": sku, "errors": errors}
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+        if self.on_error:
+            self.on_error(error)
+
+    def apply(self, chunk):
+        valid = {}
+        for line_no, row in chunk:
+            serializer = InventoryRowSerializer(data=row)
+            if serializer.is_valid():
+                # a SKU repeated within the file: the later row wins
+                given = frozenset(OPTIONAL_FIELDS.intersection(row))
+                valid[serializer.validated_data["sku"]] = (serializer.validated_data, given)
+            else:
+                self.fail(line_no, row.get("sku"), json.loads(json.dumps(serializer.errors)))
+        if not valid:
+            return
+
+        skus = list(valid)
+        # one upsert per set of optional columns given, so an update leaves the others alone
+        groups = {}
+        for data, given in valid.values():
+            data.setdefault("address", self.store.address)
+            groups.setdefault(given, []).append(data)
+        rows = FoodItem.objects.filter(store=self.store, sku__in=skus)
+        with transaction.atomic():
+            existing = set(rows.values_list("sku", flat=True))
+            for given, group in groups.items():
+                FoodItem.objects.bulk_create(
+                    [FoodItem(store=self.store, image="", **data) for data in group],
+                    update_conflicts=True,
+                    unique_fields=["store", "sku"],
+                    update_fields=UPDATE_FIELDS + sorted(given),
+                )
+            # bulk_create skips the signals that keep these in step
+            if fts_enabled():
+                update_search_vector(rows)
+            keys = list(rows.values_list("pk", "item_id"))
+            transaction.on_commit(lambda: self.invalidate(keys))
+
+        self.updated += len(existing)
+        self.created += len(skus) - len(existing)
+
+    @staticmethod
+    def invalidate(keys):
+        invalidate_items([item_id for _, item_id in keys])
+        # rewritten stock must reopen (or close) any admission queue
+        for pk, _ in keys:
+            flashsale.forget(pk)
+
+    def report(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -0,0 +1,46 @@
+import functools
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_queryset, iter_export, parse_bound
+from listings.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream reservations as NDJSON or CSV to --output (default stdout), "
+        "optionally for one store and a reserved_at range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--store", help="Store.store_id (UUID).")
+        parser.add_argument("--from", dest="since", help="ISO date or datetime, inclusive.")
+        parser.add_argument("--to", dest="until", help="ISO date (whole day included) or datetime.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", help="File to write; default stdout.")
+
+    def handle(self, *args, **options):
+        store = None
+        if options["store"]:
+            try:
+                store = Store.objects.get(store_id=uuid.UUID(options["store"]))
+            except (ValueError, Store.DoesNotExist):
+                raise CommandError(f"No store with store_id {options['store']}.")
+
+        since = parse_bound(options["since"])
+        until = parse_bound(options["until"], end=True)
+        if options["since"] and since is None or options["until"] and until is None:
+            raise CommandError("--from/--to take an ISO date or datetime.")
+
+        rows = export_queryset(store=store, since=since, until=until)
+        out = open(options["output"], "w", newline="") if options["output"] else None
+        # lines already end in a newline
+        write = out.write if out else functools.partial(self.stdout.write, ending="")
+        try:
+            for line in iter_export(rows, options["format"], options["chunk_size"]):
+                write(line)
+        finally:
+            if out:
+                out.close()
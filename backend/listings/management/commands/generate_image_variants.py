@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from listings.cache import bump_catalog_version, invalidate_items
+from listings.images import render_variants
+from listings.models import FoodItem, Store
+
+# (model, image field, variants field)
+TARGETS = [
+    (FoodItem, "image", "image_variants"),
+    (Store, "logo", "logo_variants"),
+]
+
+
+def _render(name, widths):
+    try:
+        return name, render_variants(name, widths), None
+    except Exception as exc:  # reported by the parent, never kills the pool
+        return name, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Backfill resized WebP/JPEG variants for FoodItem.image and Store.logo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Process pool size (default: CPU count).")
+        parser.add_argument("--force", action="store_true",
+                            help="Rebuild even when variants are up to date.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        widths = tuple(settings.IMAGE_VARIANT_WIDTHS)
+        force = options["force"]
+
+        # pending[(model, variants_field)] = {image name: [pk, ...]}
+        pending = {}
+        names = set()
+        for model, image_field, variants_field in TARGETS:
+            by_name = {}
+            rows = (model.objects
+                    .exclude(**{image_field: ""})
+                    .exclude(**{f"{image_field}__isnull": True})
+                    .values_list("pk", image_field, variants_field))
+            for pk, name, variants in rows.iterator(chunk_size=options["batch_size"]):
+                variants = variants or {}
+                # no "hash": the last attempt at this source failed, so retry it here
+                if force or variants.get("src") != name or "hash" not in variants:
+                    by_name.setdefault(name, []).append(pk)
+            pending[(model, variants_field)] = by_name
+            names.update(by_name)
+
+        if not names:
+            self.stdout.write("All variants up to date.")
+            return
+
+        # children must not inherit (and later close) our DB sockets
+        connections.close_all()
+
+        rendered, failed = {}, 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+            futures = [pool.submit(_render, name, widths) for name in sorted(names)]
+            for done, future in enumerate(as_completed(futures), 1):
+                name, variants, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                else:
+                    rendered[name] = variants
+                if done % 100 == 0:
+                    self.stdout.write(f"{done}/{len(futures)} images processed")
+
+        updated = 0
+        touched = {}
+        for (model, variants_field), by_name in pending.items():
+            batch = []
+            for name, pks in by_name.items():
+                if name not in rendered:
+                    continue
+                for pk in pks:
+                    obj = model(pk=pk)
+                    setattr(obj, variants_field, rendered[name])
+                    batch.append(obj)
+            fields = [variants_field]
+            if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+                fields.append("updated_at")
+                now = timezone.now()
+                for obj in batch:
+                    obj.updated_at = now
+            model.objects.bulk_update(batch, fields, batch_size=options["batch_size"])
+            updated += len(batch)
+            touched[model] = [obj.pk for obj in batch]
+
+        # bulk_update skips signals: invalidate the listing caches by hand
+        items = FoodItem.objects.filter(pk__in=touched.get(FoodItem, []))
+        store_items = FoodItem.objects.filter(store_id__in=touched.get(Store, []))
+        store_items.update(updated_at=timezone.now())
+        item_ids = list((items | store_items).values_list("item_id", flat=True))
+        for start in range(0, len(item_ids), options["batch_size"]):
+            invalidate_items(item_ids[start:start + options["batch_size"]])
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built variants for {len(rendered)} images ({updated} rows updated, {failed} failed)."
+        ))
@@ -0,0 +1,54 @@
+import json
+import sys
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.inventory import IMPORT_CHUNK_SIZE, InventoryImport, detect_format, iter_rows
+from listings.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert a store's FoodItems by SKU from a CSV or NDJSON file ('-' reads stdin). "
+        "Row errors are written as NDJSON to --report (default stderr)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--store", required=True, help="Store.store_id (UUID).")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="Default: from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument("--report", help="File for the per-row error report.")
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(store_id=uuid.UUID(options["store"]))
+        except (ValueError, Store.DoesNotExist):
+            raise CommandError(f"No store with store_id {options['store']}.")
+
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        if fmt is None:
+            raise CommandError("Can't tell the format from the file name; pass --format.")
+
+        report_file = open(options["report"], "w") if options["report"] else self.stderr
+
+        def on_error(error):
+            report_file.write(json.dumps(error) + "\n")
+
+        source = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            result = InventoryImport(store, options["chunk_size"], on_error).run(iter_rows(source, fmt))
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+            if options["report"]:
+                report_file.close()
+
+        summary = f"{result['created']} created, {result['updated']} updated, {result['failed']} failed."
+        if result["failed"]:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,248 @@
+import array
+import datetime
+import decimal
+import io
+import json
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.utils import timezone
+
+from listings.cache import bump_catalog_version
+from listings.geo import encode_geohash
+from listings.models import CartItem, FoodItem, Reservation, Store
+from listings.search import fts_enabled, update_search_vector
+
+# (city, lat, lng); stores cluster around a few neighbourhoods per city
+CITIES = [
+    ("Almaty", 43.2389, 76.8897),
+    ("Astana", 51.1605, 71.4704),
+    ("Shymkent", 42.3417, 69.5901),
+    ("Vancouver", 49.2827, -123.1207),
+    ("Toronto", 43.6532, -79.3832),
+    ("Berlin", 52.5200, 13.4050),
+    ("London", 51.5072, -0.1276),
+    ("Istanbul", 41.0082, 28.9784),
+]
+NEIGHBOURHOODS_PER_CITY = 6
+
+STORE_KINDS = ["Bakery", "Cafe", "Market", "Deli", "Kitchen", "Grocer", "Bistro", "Patisserie"]
+TITLES = {
+    "meals": ["Lunch box", "Pasta tray", "Curry bowl", "Plov portion", "Sushi set", "Salad bowl"],
+    "pastries": ["Croissant box", "Bagel bag", "Muffin mix", "Cinnamon rolls", "Baursak bag", "Danish duo"],
+    "groceries": ["Veggie crate", "Fruit bag", "Dairy bundle", "Bread loaf", "Cheese pack", "Egg tray"],
+    "drinks": ["Smoothie pair", "Cold brew", "Kefir bottles", "Juice pack", "Lemonade jug", "Iced tea"],
+    "snacks": ["Cookie jar", "Granola bars", "Chips bundle", "Nut mix", "Brownie bites", "Samsa duo"],
+}
+
+SEED_EMAIL_DOMAIN = "seed.example.com"
+
+
+def _copy_text(value):
+    """One value in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return (value.replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _columns(model):
+    # everything but the serial pk, which the sequence fills in
+    return [f for f in model._meta.concrete_fields if not isinstance(f, models.AutoField)]
+
+
+def _row_values(fields, obj):
+    values = []
+    for field in fields:
+        value = getattr(obj, field.attname)
+        if value is None or not getattr(field, "auto_now_add", False):
+            # defaults and auto_now; generated timestamps are kept as given
+            value = field.pre_save(obj, add=True)
+        if isinstance(value, uuid.UUID) or isinstance(field, models.FileField):
+            value = str(value)
+        values.append(value)
+    return values
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic catalog (users, clustered stores, food items, reservations, "
+        "cart items). Streams rows with COPY on PostgreSQL and batched bulk_create elsewhere; "
+        "memory stays flat apart from one integer per item."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--stores", type=int, default=10_000)
+        parser.add_argument("--items", type=int, default=1_000_000)
+        parser.add_argument("--reservations", type=int, default=200_000)
+        parser.add_argument("--cart-items", type=int, default=100_000)
+        parser.add_argument("--chunk-size", type=int, default=50_000,
+                            help="Rows per COPY / bulk_create batch.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--password", default="seed-password",
+                            help="Password of every generated user (hashed once).")
+        parser.add_argument("--skip-search-vectors", action="store_true",
+                            help="Don't fill FoodItem.search_vector afterwards (PostgreSQL).")
+
+    def handle(self, *args, **options):
+        counts = ("users", "stores", "items", "reservations", "cart_items")
+        for name in counts:
+            if options[name] < 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be 0 or more.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        # every store needs an owner and every item a store
+        if options["stores"] and not options["users"]:
+            raise CommandError("--stores needs --users >= 1 to pick owners from.")
+        if options["items"] and not options["stores"]:
+            raise CommandError("--items needs --stores >= 1 to put them in.")
+
+        self.rng = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        self.use_copy = connection.vendor == "postgresql"
+        self.now = timezone.now()
+        started = time.monotonic()
+
+        user_ids = self.load(get_user_model(), self.users(options["users"], options["password"]))
+        store_ids = self.load(Store, self.stores(options["stores"], user_ids))
+        item_ids = self.load(FoodItem, self.items(options["items"], store_ids))
+        self.load(Reservation, self.reservations(options["reservations"], user_ids, item_ids), keep_ids=False)
+        self.load(CartItem, self.cart_items(options["cart_items"], user_ids, item_ids), keep_ids=False)
+
+        if fts_enabled() and not options["skip_search_vectors"] and item_ids:
+            # COPY and bulk_create skip the signal that maintains it
+            t0 = time.monotonic()
+            for start in range(0, len(item_ids), self.chunk_size):
+                chunk = item_ids[start:start + self.chunk_size]
+                update_search_vector(FoodItem.objects.filter(pk__gte=chunk[0], pk__lte=chunk[-1]))
+            self.stdout.write(f"search vectors: {time.monotonic() - t0:.1f}s")
+
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.monotonic() - started:.1f}s."))
+
+    # -- loading -----------------------------------------------------------
+
+    def load(self, model, objects, keep_ids=True):
+        """Insert `objects` chunk by chunk; returns the new pks (compact array) if asked."""
+        table = model._meta.db_table
+        fields = _columns(model)
+        before = model.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+        t0, total, chunk = time.monotonic(), 0, []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= self.chunk_size:
+                total += self.flush(model, fields, chunk)
+                chunk = []
+        if chunk:
+            total += self.flush(model, fields, chunk)
+        elapsed = time.monotonic() - t0
+        self.stdout.write(f"{table}: {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)")
+
+        if not keep_ids:
+            return None
+        ids = array.array("q")
+        new = model.objects.filter(pk__gt=before).order_by("pk").values_list("pk", flat=True)
+        ids.extend(new.iterator(chunk_size=self.chunk_size))
+        return ids
+
+    def flush(self, model, fields, objs):
+        if not self.use_copy:
+            # note: bulk_create stamps auto_now_add fields with the current time
+            model.objects.bulk_create(objs, batch_size=min(self.chunk_size, 5000))
+            return len(objs)
+
+        buf = io.StringIO()
+        for obj in objs:
+            buf.write("\t".join(_copy_text(v) for v in _row_values(fields, obj)))
+            buf.write("\n")
+        buf.seek(0)
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+        sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+        with connection.cursor() as cursor:
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(sql, buf)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    while data := buf.read(1 << 20):
+                        copy.write(data)
+        return len(objs)
+
+    # -- generators --------------------------------------------------------
+
+    def users(self, n, password):
+        hashed = make_password(password)
+        run = uuid.uuid4().hex[:8]  # reruns add users instead of colliding on email
+        for i in range(n):
+            yield get_user_model()(
+                email=f"user{i}.{run}@{SEED_EMAIL_DOMAIN}",
+                password=hashed, first_name=f"User{i}",
+            )
+
+    def stores(self, n, user_ids):
+        hotspots = [
+            (city, lat + self.rng.gauss(0, 0.06), lng + self.rng.gauss(0, 0.08))
+            for city, lat, lng in CITIES
+            for _ in range(NEIGHBOURHOODS_PER_CITY)
+        ]
+        for i in range(n):
+            city, lat, lng = self.rng.choice(hotspots)
+            s_lat = lat + self.rng.gauss(0, 0.01)
+            s_lng = lng + self.rng.gauss(0, 0.015)
+            yield Store(
+                owner_id=self.rng.choice(user_ids), name=f"{self.rng.choice(STORE_KINDS)} {i}",
+                address=f"{self.rng.randint(1, 300)} Main St", city=city,
+                latitude=s_lat, longitude=s_lng, geohash=encode_geohash(s_lat, s_lng),
+                is_verified=self.rng.random() < 0.8,
+            )
+
+    def items(self, n, store_ids):
+        categories = [key for key, _ in FoodItem.CATEGORY_CHOICES]
+        today = self.now.date()
+        for _ in range(n):
+            category = self.rng.choice(categories)
+            before = decimal.Decimal(self.rng.randrange(500, 3000)) / 100
+            start = self.rng.randrange(8, 21)
+            yield FoodItem(
+                title=self.rng.choice(TITLES[category]), store_id=self.rng.choice(store_ids),
+                category=category, image="food_items/seed.jpg", address=f"{self.rng.randint(1, 300)} Main St",
+                pickup_date=today + datetime.timedelta(days=self.rng.randrange(-3, 4)),
+                pickup_start=datetime.time(start, 0), pickup_end=datetime.time(start + 2, 30),
+                description=f"Surplus {category}", available_quantity=self.rng.choice([0, 1, 2, 3, 5, 8, 20]),
+                price_before=before, price=(before * decimal.Decimal("0.4")).quantize(decimal.Decimal("0.01")),
+                rating=round(self.rng.uniform(3, 5), 1), rating_count=self.rng.randrange(0, 500),
+                created_at=self.now - datetime.timedelta(seconds=self.rng.randrange(0, 30 * 86400)),
+            )
+
+    def reservations(self, n, user_ids, item_ids):
+        if not user_ids or not item_ids:
+            return
+        for _ in range(n):
+            yield Reservation(
+                user_id=self.rng.choice(user_ids), food_item_id=self.rng.choice(item_ids),
+                quantity=self.rng.randint(1, 3), is_collected=self.rng.random() < 0.6,
+                reserved_at=self.now - datetime.timedelta(seconds=self.rng.randrange(0, 90 * 86400)),
+            )
+
+    def cart_items(self, n, user_ids, item_ids):
+        if not user_ids or not item_ids:
+            return
+        # (user, food_item) is unique: distinct items within each user's cart
+        per_user, extra = divmod(n, len(user_ids))
+        for i, user_id in enumerate(user_ids):
+            k = min(per_user + (i < extra), len(item_ids))
+            for idx in self.rng.sample(range(len(item_ids)), k):
+                yield CartItem(user_id=user_id, food_item_id=item_ids[idx], quantity=self.rng.randint(1, 3))
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from listings.cache import bump_catalog_version, invalidate_items
+from listings.models import FoodItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Zero the stock of items whose pickup window has ended, in batches, so they "
+        "drop out of the in-stock partial indexes. Meant to run every few minutes (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only count what would be swept.")
+
+    def handle(self, *args, **options):
+        # one cutoff for the whole run, so a long sweep doesn't chase the clock
+        now = timezone.now()
+        pending = FoodItem.objects.expired(now).filter(available_quantity__gt=0)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{pending.count()} expired items in stock.")
+            return
+
+        swept = 0
+        while True:
+            batch = list(pending.order_by("pk").values_list("pk", "item_id")[:options["batch_size"]])
+            if not batch:
+                break
+            pks = [pk for pk, _ in batch]
+            item_ids = [str(item_id) for _, item_id in batch]
+            with transaction.atomic():
+                # bulk update: skips the save signals, so the caches are handled here
+                swept += pending.filter(pk__in=pks).update(available_quantity=0, updated_at=now)
+                transaction.on_commit(lambda ids=item_ids: invalidate_items(ids))
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        if swept:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Swept {swept} expired items."))
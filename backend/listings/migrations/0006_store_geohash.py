@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+from listings.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Store = apps.get_model("listings", "Store")
+    batch = []
+    qs = Store.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for store in qs.only("id", "latitude", "longitude").iterator(chunk_size=2000):
+        store.geohash = encode_geohash(store.latitude, store.longitude)
+        batch.append(store)
+        if len(batch) >= 2000:
+            Store.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    if batch:
+        Store.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0005_store_latitude_store_longitude_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="store",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=12
+            ),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
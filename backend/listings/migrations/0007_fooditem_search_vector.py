@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:28
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from listings.search import search_vector_expression
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    FoodItem = apps.get_model("listings", "FoodItem")
+    Store = apps.get_model("listings", "Store")
+    FoodItem.objects.update(search_vector=search_vector_expression(Store))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0006_store_geohash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fooditem",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="fooditem_search_gin"
+            ),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
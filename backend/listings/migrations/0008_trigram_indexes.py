@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:29
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0007_fooditem_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="fooditem_title_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="store",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="store_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0008_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=models.Index(fields=["-created_at", "-id"], name="fooditem_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=models.Index(
+                fields=["category", "-created_at", "-id"], name="fooditem_cat_recent_idx"
+            ),
+        ),
+    ]
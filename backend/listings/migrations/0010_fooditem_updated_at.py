@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0009_fooditem_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fooditem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0010_fooditem_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fooditem",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="store",
+            name="logo_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0011_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fooditem",
+            name="flash_sale",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0012_fooditem_flash_sale"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fooditem",
+            name="sku",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="fooditem",
+            constraint=models.UniqueConstraint(fields=("store", "sku"), name="fooditem_store_sku_uniq"),
+        ),
+    ]
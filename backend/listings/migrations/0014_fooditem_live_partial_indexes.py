@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0013_fooditem_sku"),
+    ]
+
+    operations = [
+        # new partial indexes first, so the feeds are never without one
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=models.Index(
+                condition=models.Q(("available_quantity__gt", 0)),
+                fields=["-created_at", "-id"],
+                name="fooditem_live_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fooditem",
+            index=models.Index(
+                condition=models.Q(("available_quantity__gt", 0)),
+                fields=["category", "-created_at", "-id"],
+                name="fooditem_live_cat_recent_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="fooditem",
+            name="fooditem_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="fooditem",
+            name="fooditem_cat_recent_idx",
+        ),
+    ]
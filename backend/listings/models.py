@@ -1,10 +1,33 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 import uuid
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+from .geo import encode_geohash
 
 
 User = get_user_model()
 
+
+class FoodItemQuerySet(models.QuerySet):
+    @staticmethod
+    def _window_open(now):
+        # pickup times are wall-clock times in TIME_ZONE
+        now = timezone.localtime(now)
+        return Q(pickup_date__gt=now.date()) | Q(pickup_date=now.date(), pickup_end__gt=now.time())
+
+    def active(self, now=None):
+        """Sellable: in stock and the pickup window hasn't ended."""
+        return self.filter(self._window_open(now or timezone.now()), available_quantity__gt=0)
+
+    def expired(self, now=None):
+        """Pickup window over; stock left on these can't be collected any more."""
+        return self.exclude(self._window_open(now or timezone.now()))
+
+
 class FoodItem(models.Model):
     CATEGORY_CHOICES = [
         ("meals", "Meals"),
@@ -16,7 +39,11 @@ class FoodItem(models.Model):
     item_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     title = models.CharField(max_length=255)
     store = models.ForeignKey("Store", on_delete=models.CASCADE, related_name="food_items")
+    # the store's own product code; bulk inventory imports upsert on (store, sku)
+    sku = models.CharField(max_length=64, null=True, blank=True)
     image = models.ImageField(upload_to='food_items/')
+    # resized WebP/JPEG copies of `image`, see listings.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     rating = models.FloatField(default=0.0)
     rating_count = models.PositiveIntegerField(default=0)
     address = models.CharField(max_length=255)
@@ -27,6 +54,8 @@ class FoodItem(models.Model):
 
     description = models.TextField()
     available_quantity = models.PositiveIntegerField(default=0)
+    # hot item: reservations go through listings.flashsale batching
+    flash_sale = models.BooleanField(default=False)
 
     price_before = models.DecimalField(max_digits=6, decimal_places=2)
     price = models.DecimalField(max_digits=6, decimal_places=2)
@@ -37,10 +66,32 @@ class FoodItem(models.Model):
         default="meals"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # also bumped when the store changes (listings.signals); drives the detail ETag
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # title/store name/description/address tsvector, maintained by listings.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = FoodItemQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            # keyset pagination: (created_at, id) and per-category feeds. Only
+            # in-stock rows; sweep_expired_listings zeroes stock past pickup.
+            models.Index(fields=["-created_at", "-id"], name="fooditem_live_recent_idx",
+                         condition=Q(available_quantity__gt=0)),
+            models.Index(fields=["category", "-created_at", "-id"], name="fooditem_live_cat_recent_idx",
+                         condition=Q(available_quantity__gt=0)),
+            GinIndex(fields=["search_vector"], name="fooditem_search_gin"),
+            GinIndex(fields=["title"], name="fooditem_title_trgm", opclasses=["gin_trgm_ops"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["store", "sku"], name="fooditem_store_sku_uniq"),
+        ]
+
     def pickup_time_display(self):
         return f"{self.pickup_start.strftime('%H:%M')} - {self.pickup_end.strftime('%H:%M')}"
 
@@ -52,6 +103,7 @@ class Store(models.Model):
 
     name = models.CharField(max_length=255)
     logo = models.ImageField(upload_to='store_logos/', null=True, blank=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     phone = models.CharField(max_length=20, blank=True)
@@ -59,16 +111,29 @@ class Store(models.Model):
 
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # kept in sync with latitude/longitude on save(); used for the nearby prefilter
+    geohash = models.CharField(max_length=12, blank=True, editable=False, db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"geohash"}
+        super().save(*args, **kwargs)
+
     class Meta:
         indexes = [
             models.Index(fields=["city"]),
             models.Index(fields=["latitude", "longitude"]),
+            GinIndex(fields=["name"], name="store_name_trgm", opclasses=["gin_trgm_ops"]),
         ]
 
 class Reservation(models.Model):
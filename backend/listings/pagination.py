@@ -0,0 +1,191 @@
+import base64
+import json
+import math
+from datetime import date, datetime, time
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor keyset pagination over whatever `order_by()` the view's
+    queryset ends with (plain fields or annotations such as distance_km).
+    The ordering must end in a unique column (e.g. "-id") so every row has
+    a distinct position. NULLs follow PostgreSQL (largest) unless the
+    ordering says otherwise, e.g. F("distance_km").asc(nulls_last=True). Each page is one `WHERE (after cursor) LIMIT n+1`
+    query, so page N costs the same as page 1.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page, page_size = self._page_queryset(queryset, request)
+        return self._finish_page(list(page), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views; the page is read with the async ORM."""
+        page, page_size = self._page_queryset(queryset, request)
+        return self._finish_page([row async for row in page], page_size)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.ordering = [self._parse_ordering(o) for o in queryset.query.order_by]
+        if not self.ordering:
+            raise ValueError("KeysetPagination needs an ordered queryset.")
+
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+        return queryset[:page_size + 1], page_size
+
+    def _finish_page(self, rows, page_size):
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_position = (
+            [self._position_value(rows[-1], name) for name, _, _ in self.ordering]
+            if self.has_next else None
+        )
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_cursor(self):
+        return self.encode_cursor(self.next_position) if self.has_next else None
+
+    def get_next_link(self):
+        return self.build_next_link(self.request, self.get_next_cursor())
+
+    def build_next_link(self, request, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _parse_ordering(item):
+        """-> (field name, descending, NULLs come after every value)"""
+        if isinstance(item, str):
+            descending = item.startswith("-")
+            return item.lstrip("-"), descending, not descending
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            if item.nulls_last:
+                nulls_after = True
+            elif item.nulls_first:
+                nulls_after = False
+            else:
+                nulls_after = not item.descending
+            return item.expression.name, item.descending, nulls_after
+        raise ValueError(f"KeysetPagination cannot page over ordering {item!r}.")
+
+    # ----- cursor encoding -----
+
+    def encode_cursor(self, position):
+        payload = json.dumps({"o": self.ordering, "p": position}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            ordering, position = payload["o"], payload["p"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # a cursor is only meaningful for the sort order that produced it
+        if ordering != [list(o) for o in self.ordering] or not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # a tampered value must not reach .filter() as the wrong type
+        try:
+            return [
+                None if value is None else self._clean_value(queryset, name, value)
+                for (name, _, _), value in zip(self.ordering, position)
+            ]
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _clean_value(queryset, name, value):
+        """`value` as the Python type of the ordering column (field or annotation)."""
+        if name in queryset.query.annotations:
+            field = queryset.query.annotations[name].output_field
+        else:
+            field = queryset.model._meta.get_field(name)
+        if isinstance(value, (list, dict)) or (isinstance(value, float) and not math.isfinite(value)):
+            raise ValueError(value)
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+
+    @staticmethod
+    def _position_value(obj, name):
+        value = getattr(obj, name)
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        if value is not None and not isinstance(value, (int, float, str, bool)):
+            return str(value)
+        return value
+
+    def _after(self, position):
+        """
+        Rows strictly after `position` in the (possibly mixed-direction)
+        ordering: (a > va) | (a = va & b < vb) | (a = va & b = vb & c < vc) ...
+        ANDed with an inclusive bound on the first column on its own (a >= va),
+        which is what lets the database turn the cursor into an index range
+        seek instead of filtering every row before it.
+        """
+        q = Q()
+        equal = Q()
+        for (name, descending, nulls_after), value in zip(self.ordering, position):
+            if value is None:
+                beyond = Q(**{f"{name}__isnull": False}) if not nulls_after else None
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                beyond = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if nulls_after:
+                    beyond |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if beyond is not None:
+                q |= equal & beyond
+            equal &= same
+        return self._leading_bound(position[0]) & q
+
+    def _leading_bound(self, value):
+        name, descending, nulls_after = self.ordering[0]
+        if value is None:
+            # at the NULLs: only more NULLs follow, unless they sort first
+            return Q(**{f"{name}__isnull": True}) if nulls_after else Q()
+        bound = Q(**{f"{name}__{'lte' if descending else 'gte'}": value})
+        if nulls_after:
+            bound |= Q(**{f"{name}__isnull": True})
+        return bound
@@ -0,0 +1,132 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Value
+
+SEARCH_CONFIG = "english"
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == "postgresql"
+
+
+def search_vector_expression(store_model=None):
+    """
+    Weighted document for FoodItem.search_vector. Store name/address are
+    denormalized in via correlated subqueries so the row can be rebuilt
+    with a single UPDATE.
+    """
+    if store_model is None:
+        from .models import Store as store_model
+
+    store = store_model.objects.filter(pk=OuterRef("store_id"))
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(store.values("name")[:1]), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        + SearchVector(
+            "address", Subquery(store.values("address")[:1]),
+            weight="D", config=SEARCH_CONFIG,
+        )
+    )
+
+
+def update_search_vector(queryset):
+    """Rebuild the search column for every row in `queryset` (no-op off PostgreSQL)."""
+    if not fts_enabled():
+        return 0
+    return queryset.update(search_vector=search_vector_expression())
+
+
+def build_search_query(q):
+    """
+    AND of prefix terms ("pasta bak" -> 'pasta':* & 'bak':*), so partially
+    typed words still match like the old icontains filter did.
+    """
+    terms = _TERM_RE.findall(q.lower())
+    if not terms:
+        return None
+    raw = " & ".join(f"{t}:*" for t in terms)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+def apply_search(qs, q):
+    """
+    Filter `qs` by the ?q= string. On PostgreSQL this hits the GIN index
+    and annotates `search_rank`; elsewhere it falls back to icontains.
+    """
+    if not fts_enabled():
+        for term in re.split(r"\s+", q):
+            if term:
+                qs = qs.filter(
+                    Q(title__icontains=term)
+                    | Q(description__icontains=term)
+                    | Q(address__icontains=term)
+                    | Q(store__name__icontains=term)
+                )
+        return qs
+
+    query = build_search_query(q)
+    if query is None:
+        return qs
+    return (qs
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query)))
+
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+
+def suggest(q, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    Typeahead matches for item titles and store names, best first.
+    Uses pg_trgm word similarity (`%>`), which the gin_trgm_ops indexes
+    serve and which tolerates typos; falls back to icontains elsewhere.
+    """
+    from .models import FoodItem, Store
+
+    items = FoodItem.objects.active()
+    stores = Store.objects.filter(
+        Exists(FoodItem.objects.active().filter(store=OuterRef("pk")))
+    )
+
+    if fts_enabled():
+        items = (items
+                 .filter(title__trigram_word_similar=q)
+                 .annotate(score=TrigramWordSimilarity(q, "title")))
+        stores = (stores
+                  .filter(name__trigram_word_similar=q)
+                  .annotate(score=TrigramWordSimilarity(q, "name")))
+    else:
+        items = items.filter(title__icontains=q).annotate(score=Value(1.0))
+        stores = stores.filter(name__icontains=q).annotate(score=Value(1.0))
+
+    rows = [
+        (text, "item", score)
+        for text, score in items.order_by("-score", "title")
+        .values_list("title", "score").distinct()[:limit]
+    ] + [
+        (text, "store", score)
+        for text, score in stores.order_by("-score", "name")
+        .values_list("name", "score").distinct()[:limit]
+    ]
+    rows.sort(key=lambda r: -r[2])
+
+    seen = set()
+    results = []
+    for text, kind, score in rows:
+        key = text.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append({"text": text, "kind": kind, "score": round(float(score), 3)})
+        if len(results) >= limit:
+            break
+    return results
@@ -1,10 +1,25 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
+from . import flashsale
+from .cache import bump_catalog_version, invalidate_items
+from .images import variant_urls
 from .models import FoodItem, Reservation, CartItem
+from .sparse import SparseFieldsetMixin
 
-class FoodItemSerializer(serializers.ModelSerializer):
+class FoodItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     store_name = serializers.CharField(source="store.name", read_only=True)
     image = serializers.ImageField(use_url=True)
     distance_km = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    store_logo_variants = serializers.SerializerMethodField()
+
+    method_field_sources = {
+        "distance_km": [],  # annotation, not a column
+        "image_variants": ["image_variants"],
+        "store_logo_variants": ["store__logo_variants"],
+    }
 
     class Meta:
         model = FoodItem
@@ -16,12 +31,14 @@ class FoodItemSerializer(serializers.ModelSerializer):
             "pickup_start",
             "pickup_end",
             "image",
+            "image_variants",
             "rating",
             "rating_count",
             "available_quantity",
             "price",
             "price_before",
             "store_name",
+            "store_logo_variants",
             "distance_km",
         ]
 
@@ -29,15 +46,28 @@ class FoodItemSerializer(serializers.ModelSerializer):
         d = getattr(obj, "distance_km", None)
         return round(float(d), 2) if d is not None else None
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get("request"))
+
+    def get_store_logo_variants(self, obj):
+        return variant_urls(obj.store.logo_variants, self.context.get("request"))
 
 
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+
+class ReservationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # the response nests the item, store name included
+    food_item = serializers.PrimaryKeyRelatedField(queryset=FoodItem.objects.select_related("store"))
     food = FoodItemSerializer(source="food_item", read_only=True)   # ✅ add this
     food_item_title = serializers.SerializerMethodField()
     user_email = serializers.SerializerMethodField()
 
+    method_field_sources = {
+        "food_item_title": ["food_item__title"],
+        "user_email": ["user__email"],
+    }
+
     class Meta:
         model = Reservation
         fields = [
@@ -52,6 +82,7 @@ class ReservationSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         food_item = attrs['food_item']
         quantity = attrs['quantity']
+        # early reject only; create() re-checks atomically
         if food_item.available_quantity < quantity:
             raise serializers.ValidationError("Not enough quantity available.")
         return attrs
@@ -61,18 +92,53 @@ class ReservationSerializer(serializers.ModelSerializer):
         food_item = validated_data['food_item']
         quantity = validated_data['quantity']
 
-        food_item.available_quantity -= quantity
-        food_item.save()
-
-        return Reservation.objects.create(user=user, **validated_data)
+        if food_item.flash_sale:
+            return flashsale.queue_for(food_item).reserve(food_item, user, quantity)
+
+        with transaction.atomic():
+            # one conditional UPDATE: the row lock makes check-and-decrement atomic
+            updated = FoodItem.objects.filter(
+                pk=food_item.pk, available_quantity__gte=quantity
+            ).update(
+                available_quantity=F("available_quantity") - quantity,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                raise serializers.ValidationError("Not enough quantity available.")
+            reservation = Reservation.objects.create(user=user, **validated_data)
+            transaction.on_commit(bump_catalog_version)
+            transaction.on_commit(lambda: invalidate_items([food_item.item_id]))
+
+        food_item.refresh_from_db(fields=["available_quantity", "updated_at"])
+        return reservation
 
     def get_user_email(self, obj):
         return obj.user.email   # ✅ end the method here (no stray text)
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     food_item = FoodItemSerializer(read_only=True)
 
     class Meta:
         model = CartItem
         fields = ["id", "food_item", "quantity", "added_at"]
+
+
+CART_BULK_MAX_ITEMS = 200
+CART_MAX_QUANTITY = 999  # per line; well inside the column's integer range
+
+
+class CartBulkItemSerializer(serializers.Serializer):
+    item_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=0, max_value=CART_MAX_QUANTITY)  # 0 removes the line
+
+
+class CartBulkSerializer(serializers.Serializer):
+    items = CartBulkItemSerializer(many=True)
+
+    def validate_items(self, items):
+        if len(items) > CART_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f"At most {CART_BULK_MAX_ITEMS} items per request.")
+        # a repeated item_id: the last entry wins, like applying them in order
+        return list({row["item_id"]: row for row in items}.values())
+
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import flashsale
+from .cache import bump_catalog_version, invalidate_items
+from .images import refresh_variants
+from .models import FoodItem, Store
+from .search import update_search_vector
+
+
+@receiver(post_save, sender=FoodItem)
+def build_item_image_variants(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    refresh_variants(instance, "image", "image_variants")
+
+
+@receiver(post_save, sender=Store)
+def build_store_logo_variants(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "logo" not in update_fields):
+        return
+    refresh_variants(instance, "logo", "logo_variants")
+
+
+ITEM_SEARCH_FIELDS = {"title", "description", "address", "store", "store_id"}
+STORE_SEARCH_FIELDS = {"name", "address"}
+
+
+def _touches(update_fields, watched):
+    return update_fields is None or bool(watched & set(update_fields))
+
+
+@receiver(post_save, sender=FoodItem)
+def refresh_item_search_vector(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not _touches(update_fields, ITEM_SEARCH_FIELDS):
+        return
+    update_search_vector(FoodItem.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Store)
+def refresh_store_items_search_vector(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # a brand-new store has no items yet
+    if raw or created or not _touches(update_fields, STORE_SEARCH_FIELDS):
+        return
+    update_search_vector(FoodItem.objects.filter(store_id=instance.pk))
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_listing_cache(sender, raw=False, **kwargs):
+    if raw:
+        return
+    # after commit, so a concurrent reader can't re-cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def invalidate_item_detail(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    item_id = instance.item_id
+    transaction.on_commit(lambda: invalidate_items([item_id]))
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def reset_flash_sale_stock(sender, instance, raw=False, **kwargs):
+    # a restock must reopen a hot item this process has marked sold out
+    if raw:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: flashsale.forget(pk))
+
+
+@receiver(post_save, sender=Store)
+def touch_store_items(sender, instance, created=False, raw=False, **kwargs):
+    # item payloads embed store.name, so a store edit is an edit of each item
+    if raw or created:
+        return
+    items = FoodItem.objects.filter(store_id=instance.pk)
+    item_ids = list(items.values_list("item_id", flat=True))
+    items.update(updated_at=timezone.now())
+    transaction.on_commit(lambda: invalidate_items(item_ids))
@@ -0,0 +1,166 @@
+"""
+Sparse fieldsets: ?fields=title,price,distance_km / ?omit=description.
+
+Dotted names reach into nested serializers (?fields=id,food.title). Only
+read requests are trimmed; writes always see the full serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, OrderBy
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _split(value):
+    return {p.strip() for p in (value or "").split(",") if p.strip()}
+
+
+def fieldset_params(request):
+    """Normalized (fields, omit) for cache keys; fields is None when not restricted."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, []
+    params = request.query_params
+    fields = _split(params.get(FIELDS_PARAM)) if FIELDS_PARAM in params else None
+    return (sorted(fields) if fields is not None else None), sorted(_split(params.get(OMIT_PARAM)))
+
+
+def _group(paths):
+    top, nested = set(), {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        if rest:
+            nested.setdefault(head, set()).add(rest)
+        else:
+            top.add(head)
+    return top, nested
+
+
+def _unwrap(field):
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def apply_fieldset(serializer, fields=None, omit=()):
+    top_keep, nested_keep = _group(fields or ())
+    top_omit, nested_omit = _group(omit)
+
+    for name in list(serializer.fields):
+        if fields is not None and name not in top_keep and name not in nested_keep:
+            serializer.fields.pop(name)
+        elif name in top_omit:
+            serializer.fields.pop(name)
+
+    for name, field in serializer.fields.items():
+        child = _unwrap(field)
+        if not isinstance(child, serializers.Serializer):
+            continue
+        # "food" alone keeps the whole nested object; "food.title" narrows it
+        child_fields = nested_keep.get(name) if name not in top_keep else None
+        child_omit = nested_omit.get(name, ())
+        if child_fields is not None or child_omit:
+            apply_fieldset(child, child_fields, child_omit)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin. SerializerMethodFields list the ORM paths they read
+    in `method_field_sources` so the view can narrow its SELECT to match.
+    """
+    method_field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, omit = fieldset_params(self.context.get("request"))
+        if fields is not None or omit:
+            apply_fieldset(self, fields, omit)
+
+
+def serializer_columns(serializer, prefix=""):
+    """
+    ORM paths the serializer's remaining fields read, or None if some
+    field's dependencies are unknown (then nothing is deferred).
+    """
+    columns = []
+    for name, field in serializer.fields.items():
+        child = _unwrap(field)
+        if isinstance(child, serializers.Serializer):
+            if field.source == "*":
+                return None
+            path = prefix + "__".join(field.source_attrs)
+            nested = serializer_columns(child, path + "__")
+            if nested is None:
+                return None
+            columns += [path] + nested
+        elif isinstance(field, serializers.SerializerMethodField):
+            sources = getattr(serializer, "method_field_sources", {})
+            if name not in sources:
+                return None
+            columns += [prefix + s for s in sources[name]]
+        elif field.source == "*":
+            return None
+        else:
+            columns.append(prefix + "__".join(field.source_attrs))
+    return columns
+
+
+def _loadable(path, select_related, model):
+    """
+    Trim `path` back to the deepest prefix .only() can load: joins must be
+    select_related, and the last hop must be a concrete column (an
+    annotation like distance_km is always selected anyway).
+    """
+    parts = path.split("__")
+    joined = select_related if isinstance(select_related, dict) else {}
+    current = model
+    for i, part in enumerate(parts):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return "__".join(parts[:i]) or None
+        if not field.is_relation or i == len(parts) - 1:
+            return "__".join(parts[:i + 1]) if field.concrete else ("__".join(parts[:i]) or None)
+        if select_related is not True and part not in joined:
+            return "__".join(parts[:i + 1])
+        joined = joined.get(part, {}) if isinstance(joined, dict) else {}
+        current = field.related_model
+    return path
+
+
+class SparseFieldsetViewMixin:
+    """View mixin: push the requested fieldset down into .only()."""
+
+    def trim_queryset(self, queryset, *always):
+        fields, omit = fieldset_params(self.request)
+        if fields is None and not omit:
+            return queryset
+        columns = serializer_columns(self.get_serializer())
+        if columns is None:
+            return queryset
+
+        # keyset pagination reads the ordering columns off each row
+        for item in queryset.query.order_by:
+            if isinstance(item, str):
+                columns.append(item.lstrip("-"))
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                columns.append(item.expression.name)
+
+        model = queryset.model
+        loadable = {
+            p for p in (_loadable(c, queryset.query.select_related, model) for c in [*columns, *always])
+            if p and p != "pk"
+        }
+        if not loadable:
+            return queryset
+
+        # a select_related join nobody reads anymore would conflict with .only()
+        joins = {
+            "__".join(parts[:i])
+            for parts in (p.split("__") for p in loadable)
+            for i in range(1, len(parts))
+        }
+        if queryset.query.select_related:
+            queryset = queryset.select_related(None)
+            if joins:
+                queryset = queryset.select_related(*joins)
+        return queryset.only(*loadable)
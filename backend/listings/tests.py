@@ -1,3 +1,1061 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import flashsale, images
+from .async_views import FoodItemDetailAsyncView, FoodItemListAsyncView
+from .models import CartItem, FoodItem, Reservation, Store
+from .pagination import KeysetPagination
+from .serializers import ReservationSerializer
+
+User = get_user_model()
+
+# sized so a developer box finishes in seconds; raise for a real soak
+STRESS_REQUESTS = int(os.environ.get("RESERVATION_STRESS_REQUESTS", 2000))
+STRESS_THREADS = int(os.environ.get("RESERVATION_STRESS_THREADS", 32))
+STRESS_STOCK = int(os.environ.get("RESERVATION_STRESS_STOCK", 500))
+
+
+def make_item(owner, **kwargs):
+    store = kwargs.pop("store", None) or Store.objects.create(
+        owner=owner, name="Bakery", address="1 Main St", city="Almaty",
+        latitude=43.24, longitude=76.89,
+    )
+    defaults = dict(
+        title="Croissant box", store=store, image="",
+        address="1 Main St", pickup_date=datetime.date.today() + datetime.timedelta(days=1),
+        pickup_start=datetime.time(0, 0), pickup_end=datetime.time(23, 59),
+        description="buttery", available_quantity=5,
+        price_before="10.00", price="4.00", category="pastries",
+    )
+    defaults.update(kwargs)
+    return FoodItem.objects.create(**defaults)
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0, QUERY_BUDGET_STRICT=True)
+class APITestCase(TestCase):
+    """Listing caches off, and a view over its query budget fails the test."""
+
+
+class ReservationInventoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.item = make_item(self.user, available_quantity=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def reserve(self, quantity):
+        return self.client.post(
+            "/api/reservations/", {"food_item": self.item.pk, "quantity": quantity}, format="json"
+        )
+
+    def test_reservation_decrements_stock(self):
+        response = self.reserve(2)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["food"]["available_quantity"], 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.available_quantity, 1)
+
+    def test_stale_read_cannot_oversell(self):
+        self.assertEqual(self.reserve(2).status_code, 201)
+        # another writer drains the row after validate() has seen the old value
+        FoodItem.objects.filter(pk=self.item.pk).update(available_quantity=0)
+        with mock.patch.object(ReservationSerializer, "validate", lambda self, attrs: attrs):
+            response = self.reserve(1)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.available_quantity, 0)
+
+
+@override_settings(FLASH_SALE_BATCH_WINDOW_MS=0)
+class FlashSaleTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.item = make_item(self.user, available_quantity=2, flash_sale=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        flashsale.forget(self.item.pk)
+
+    def reserve(self, quantity=1):
+        return self.client.post(
+            "/api/reservations/", {"food_item": self.item.pk, "quantity": quantity}, format="json"
+        )
+
+    def test_sold_out_is_rejected_without_queries(self):
+        self.assertEqual(self.reserve(2).status_code, 201)
+        # the batch that emptied the item told this process; no query needed now
+        with self.assertNumQueries(0):
+            response = self.reserve()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"], "Sold out.")
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_restock_reopens_item(self):
+        self.assertEqual(self.reserve(2).status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.refresh_from_db()
+            self.item.available_quantity = 1
+            self.item.save()
+        response = self.reserve()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["food"]["available_quantity"], 0)
+
+    def test_batch_admits_in_order_without_oversell(self):
+        queue = flashsale.queue_for(self.item)
+        tickets = [flashsale._Ticket(self.user, q) for q in (1, 2, 1)]
+        self.assertEqual(queue._apply(tickets), 0)
+        self.assertIsNotNone(tickets[0].reservation)
+        self.assertIsInstance(tickets[1].error, flashsale.SoldOut)
+        self.assertIsNotNone(tickets[2].reservation)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.available_quantity, 0)
+
+    @override_settings(FLASH_SALE_MAX_BATCH=1)
+    def test_leader_applies_its_own_batch_then_hands_over(self):
+        queue = flashsale.queue_for(self.item)
+        first, second = flashsale._Ticket(self.user, 1), flashsale._Ticket(self.user, 1)
+        queue._pending[:] = [first, second]
+        queue._flushing = first.lead = True
+
+        queue._drain(wait=False)
+        self.assertTrue(first.done)
+        self.assertFalse(second.done)
+        self.assertTrue(second.lead and second.wake.is_set())
+
+        queue._drain(wait=False)
+        self.assertTrue(second.done)
+        self.assertFalse(queue._flushing)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_idle_queues_are_dropped(self):
+        self.assertEqual(self.reserve(1).status_code, 201)
+        self.assertNotIn(self.item.pk, flashsale._queues)
+        # a sold-out verdict is kept for the query-free 409
+        self.assertEqual(self.reserve(1).status_code, 201)
+        self.assertIn(self.item.pk, flashsale._queues)
+
+
+class CartBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.store = Store.objects.create(owner=self.user, name="Bakery", address="1 Main St", city="Almaty")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def items(self, n):
+        return [make_item(self.user, store=self.store, title=f"Box {i}") for i in range(n)]
+
+    def bulk(self, rows):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/cart/bulk/", rows, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), len(queries)
+
+    def test_upsert_and_delete(self):
+        a, b, c = self.items(3)
+        CartItem.objects.create(user=self.user, food_item=a, quantity=1)
+        CartItem.objects.create(user=self.user, food_item=b, quantity=1)
+
+        body, _ = self.bulk([
+            {"item_id": str(a.item_id), "quantity": 4},
+            {"item_id": str(b.item_id), "quantity": 0},
+            {"item_id": str(c.item_id), "quantity": 2},
+        ])
+        cart = dict(CartItem.objects.filter(user=self.user).values_list("food_item_id", "quantity"))
+        self.assertEqual(cart, {a.pk: 4, c.pk: 2})
+        self.assertEqual(len(body["items"]), 2)
+        self.assertEqual(body["missing"], [])
+
+    def test_unknown_items_are_reported(self):
+        (a,) = self.items(1)
+        ghost = "00000000-0000-0000-0000-000000000000"
+        body, _ = self.bulk({"items": [{"item_id": ghost, "quantity": 1}, {"item_id": str(a.item_id), "quantity": 1}]})
+        self.assertEqual(body["missing"], [ghost])
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 1)
+
+    def test_query_count_is_constant(self):
+        small, large = self.items(2), self.items(25)
+        _, few = self.bulk([{"item_id": str(i.item_id), "quantity": n % 3} for n, i in enumerate(small)])
+        _, many = self.bulk([{"item_id": str(i.item_id), "quantity": n % 3} for n, i in enumerate(large)])
+        self.assertEqual(few, many)
+
+    def test_rejects_negative_quantity(self):
+        (a,) = self.items(1)
+        response = self.client.post("/api/cart/bulk/", [{"item_id": str(a.item_id), "quantity": -1}], format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_quantity_past_the_cap(self):
+        (a,) = self.items(1)
+        for quantity in (1000, 2 ** 63):
+            response = self.client.post("/api/cart/bulk/", [{"item_id": str(a.item_id), "quantity": quantity}],
+                                        format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+
+class CartCheckoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.store = Store.objects.create(owner=self.user, name="Bakery", address="1 Main St", city="Almaty")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, n, stock=5, quantity=2):
+        items = [
+            make_item(self.user, store=self.store, title=f"Box {i}", available_quantity=stock)
+            for i in range(n)
+        ]
+        CartItem.objects.bulk_create([CartItem(user=self.user, food_item=i, quantity=quantity) for i in items])
+        return items
+
+    def checkout(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/cart/checkout/", format="json")
+        return response, len(queries)
+
+    def test_checkout_reserves_everything_and_clears_cart(self):
+        items = self.fill_cart(3)
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()["reservations"]), 3)
+        self.assertEqual(response.json()["reservations"][0]["food"]["available_quantity"], 3)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            sorted(FoodItem.objects.filter(pk__in=[i.pk for i in items]).values_list("available_quantity", flat=True)),
+            [3, 3, 3],
+        )
+
+    def test_shortfall_changes_nothing(self):
+        items = self.fill_cart(2)
+        FoodItem.objects.filter(pk=items[1].pk).update(available_quantity=1)
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["shortfalls"], [{
+            "item_id": str(items[1].item_id), "title": items[1].title, "requested": 2, "available": 1,
+        }])
+        self.assertEqual(Reservation.objects.count(), 0)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(FoodItem.objects.get(pk=items[0].pk).available_quantity, 5)
+
+    def test_empty_cart(self):
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_is_constant(self):
+        self.fill_cart(2)
+        _, few = self.checkout()
+        self.fill_cart(20)
+        _, many = self.checkout()
+        self.assertEqual(few, many)
+
+
+class NearbyFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", password="pw")
+        self.near = make_item(self.user)
+        far = Store.objects.create(owner=self.user, name="Far", address="2 Far Rd", city="Astana",
+                                   latitude=51.17, longitude=71.45)
+        self.far = make_item(self.user, store=far)
+
+    def ids(self, **params):
+        response = self.client.get("/api/fooditems/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row["item_id"] for row in response.json()["results"]}
+
+    def test_non_finite_numbers_are_ignored(self):
+        everything = {str(self.near.item_id), str(self.far.item_id)}
+        self.assertEqual(self.ids(lat="nan", lng=0, max_distance_km=5), everything)
+        self.assertEqual(self.ids(lat=43.24, lng="-inf", max_distance_km=5), everything)
+        self.assertEqual(self.ids(lat=43.24, lng=76.89, max_distance_km="nan"), everything)
+        self.assertEqual(self.ids(lat=43.24, lng=76.89, max_distance_km="inf"), everything)
+        self.assertEqual(self.ids(lat=43.24, lng=76.89, max_distance_km=5), {str(self.near.item_id)})
+
+    def test_distances_use_the_exact_point(self):
+        # 43.2424 snaps to the store's own 43.24 on the cache grid, ~270 m away
+        self.assertEqual(self.ids(lat=43.2424, lng=76.89, max_distance_km=0.2), set())
+        response = self.client.get("/api/fooditems/", {"lat": 43.2424, "lng": 76.89, "max_distance_km": 0.3})
+        (row,) = response.json()["results"]
+        self.assertAlmostEqual(row["distance_km"], 0.267, places=2)
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=60)
+    def test_cache_key_snaps_to_the_grid(self):
+        cache.clear()
+        params = {"lat": 43.2424, "lng": 76.89, "max_distance_km": 0.3}
+        self.assertEqual(len(self.client.get("/api/fooditems/", params).json()["results"]), 1)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/fooditems/", {**params, "lat": 43.2421})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_coordinates_are_clamped(self):
+        self.assertEqual(self.ids(lat=1000, lng=76.89, max_distance_km=5), set())
+        self.assertEqual(self.ids(lat=-1e308, lng=-1e308, max_distance_km=1e308),
+                         {str(self.near.item_id), str(self.far.item_id)})
+
+
+class MapClusterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", password="pw")
+
+    def store(self, lat, lng):
+        return Store.objects.create(owner=self.user, name="Shop", address="1 Main St", city="Almaty",
+                                    latitude=lat, longitude=lng)
+
+    def clusters(self, bbox, zoom=4, **params):
+        response = self.client.get("/api/map/clusters/", {"bbox": bbox, "zoom": zoom, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_invalid_bbox(self):
+        for bbox in (None, "1,2,3", "a,b,c,d", "0,50,10,40", "0,-91,10,10", "-181,0,10,10", "nan,0,10,10"):
+            with self.subTest(bbox):
+                params = {} if bbox is None else {"bbox": bbox}
+                response = self.client.get("/api/map/clusters/", params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("bbox", response.json())
+        response = self.client.get("/api/map/clusters/", {"bbox": "0,0,10,10", "zoom": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("zoom", response.json())
+
+    def test_groups_stores_into_grid_cells(self):
+        # 5.625 degree cells at zoom 4: Almaty's two stores share one, Astana has its own
+        a, b = self.store(43.24, 76.89), self.store(43.30, 77.01)
+        make_item(self.user, store=a, price="4.00")
+        make_item(self.user, store=a, price="3.50", category="meals")
+        make_item(self.user, store=b, price="6.00")
+        make_item(self.user, store=b, available_quantity=0, price="1.00")
+        make_item(self.user, store=self.store(51.17, 71.45))
+        make_item(self.user, store=self.store(-33.87, 151.21))
+
+        data = self.clusters("60,30,90,60")
+        self.assertEqual(data["cell_deg"], 5.625)
+        clusters = sorted(data["clusters"], key=lambda c: c["items"])
+        self.assertEqual(len(clusters), 2)
+        astana, almaty = clusters
+        self.assertEqual((astana["stores"], astana["items"]), (1, 1))
+        self.assertEqual((astana["lat"], astana["lng"]), (51.17, 71.45))
+        self.assertEqual((almaty["stores"], almaty["items"], almaty["min_price"]), (2, 3, "3.50"))
+        # the centroid averages the cell's items, so the store with two counts twice
+        self.assertAlmostEqual(almaty["lat"], (43.24 * 2 + 43.30) / 3, places=6)
+        self.assertAlmostEqual(almaty["lng"], (76.89 * 2 + 77.01) / 3, places=6)
+
+        (meals,) = self.clusters("60,30,90,60", category="meals")["clusters"]
+        self.assertEqual((meals["items"], meals["min_price"]), (1, "3.50"))
+
+    def test_bbox_across_the_antimeridian(self):
+        make_item(self.user, store=self.store(-17.7, 179.5))
+        make_item(self.user, store=self.store(-17.7, -179.5))
+        make_item(self.user, store=self.store(-17.7, 0))
+
+        clusters = self.clusters("170,-20,-170,-10")["clusters"]
+        self.assertEqual(sorted(c["lng"] for c in clusters), [-179.5, 179.5])
+        self.assertEqual(self.clusters("-170,-20,170,-10")["clusters"][0]["lng"], 0)
+
+    def test_cell_count_is_capped(self):
+        for lat, lng in ((43.24, 76.89), (51.17, 71.45), (-33.87, 151.21), (40.71, -74.0)):
+            make_item(self.user, store=self.store(lat, lng))
+
+        data = self.clusters("-180,-90,180,90", zoom=22)
+        cell = data["cell_deg"]
+        self.assertGreater(cell, 360.0 / ((1 << 22) * 4))
+        self.assertLessEqual((180 / cell) * (360 / cell), 2500)
+        self.assertEqual(sum(c["items"] for c in data["clusters"]), 4)
+
+
+class CursorTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(email="owner@example.com", password="pw")
+        for i in range(3):
+            make_item(user, title=f"Box {i}")
+
+    def next_cursor(self, **params):
+        response = self.client.get("/api/fooditems/", {"page_size": 1, **params})
+        return response.json()["next"].split("cursor=")[1].split("&")[0]
+
+    def tampered(self, cursor, index, value):
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        payload["p"][index] = value
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    def get(self, cursor, **params):
+        return self.client.get("/api/fooditems/", {"page_size": 1, "cursor": cursor, **params})
+
+    def test_follows_a_genuine_cursor(self):
+        self.assertEqual(self.get(self.next_cursor()).status_code, 200)
+
+    def test_first_column_is_bounded_on_its_own(self):
+        # an AND-ed bound on created_at is what makes the cursor an index range seek
+        cursor = self.next_cursor()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(cursor)
+        self.assertEqual(len(response.json()["results"]), 1)
+        (sql,) = [q["sql"] for q in queries if "ORDER BY" in q["sql"]]
+        self.assertRegex(sql, r'AND "listings_fooditem"\."created_at" <= (\'[^\']*\'|%s) AND \(')
+
+    def test_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"page_size": 1, **({"cursor": cursor} if cursor else {})}
+            body = self.client.get("/api/fooditems/", params).json()
+            seen += [row["item_id"] for row in body["results"]]
+            if not body["next"]:
+                break
+            cursor = body["next"].split("cursor=")[1].split("&")[0]
+        self.assertEqual(sorted(seen), sorted(str(i) for i in FoodItem.objects.values_list("item_id", flat=True)))
+
+    def test_wrongly_typed_positions_are_404(self):
+        cursor = self.next_cursor()
+        for index, value in [(0, "yesterday"), (0, 17), (1, "abc"), (1, 10 ** 30), (1, [1]), (1, 1.5e400)]:
+            response = self.get(self.tampered(cursor, index, value))
+            self.assertEqual(response.status_code, 404, (index, value))
+            self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+        params = {"lat": 43.24, "lng": 76.89}
+        cursor = self.next_cursor(**params)
+        self.assertEqual(self.get(cursor, **params).status_code, 200)
+        self.assertEqual(self.get(self.tampered(cursor, 0, "far"), **params).status_code, 404)
+
+
+class QueryBudgetTests(APITestCase):
+    """Query counts must not grow with the number of rows returned."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, n):
+        # each row on its own store, so a missing join shows up as N+1
+        for i in range(n):
+            item = make_item(self.user, title=f"Box {i}")
+            CartItem.objects.create(user=self.user, food_item=item)
+            Reservation.objects.create(user=self.user, food_item=item)
+
+    def count(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertConstant(self, url, **params):
+        self.add_rows(2)
+        few = self.count(url, **params)
+        self.add_rows(15)
+        self.assertEqual(self.count(url, **params), few)
+
+    def test_fooditems(self):
+        self.assertConstant("/api/fooditems/")
+
+    def test_fooditems_nearby(self):
+        self.assertConstant("/api/fooditems/", lat=43.24, lng=76.89, max_distance_km=5)
+
+    def test_fooditems_sparse(self):
+        self.assertConstant("/api/fooditems/", fields="id,title,store_name")
+
+    def test_reservations(self):
+        self.assertConstant("/api/reservations/")
+
+    def test_reservations_sparse(self):
+        self.assertConstant("/api/reservations/", fields="id,user_email,food.store_name")
+
+    def test_cart(self):
+        self.assertConstant("/api/cart/")
+
+    def test_over_budget_fails(self):
+        from .views import ReservationListCreateView
+        from backend.querybudget import QueryBudgetExceeded
+
+        with mock.patch.object(ReservationListCreateView, "query_budget", {"get": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/api/reservations/")
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_logs_when_not_strict(self):
+        from .views import ReservationListCreateView
+
+        with mock.patch.object(ReservationListCreateView, "query_budget", {"get": 0}):
+            with self.assertLogs("backend.querybudget", "WARNING"):
+                response = self.client.get("/api/reservations/")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                            "LOCATION": "budget_test_cache"}},
+        LISTINGS_CACHE_TIMEOUT=60,
+    )
+    def test_database_cache_is_not_counted(self):
+        call_command("createcachetable", verbosity=0)
+        item = make_item(self.user)
+        for url in ["/api/fooditems/", "/api/fooditems/", f"/api/fooditems/{item.item_id}/"] * 2:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)  # strict budget of 1 would raise
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(any("budget_test_cache" in q["sql"] for q in queries))
+
+
+class InventoryImportTests(APITestCase):
+    HEADER = "sku,title,category,price,price_before,available_quantity,pickup_date,pickup_start,pickup_end\n"
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="pw")
+        self.store = Store.objects.create(owner=self.owner, name="Market", address="9 Dock Rd", city="Almaty")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def upload(self, name, body, store=None):
+        upload = SimpleUploadedFile(name, body.encode())
+        url = f"/api/stores/{(store or self.store).store_id}/inventory/"
+        return self.client.post(url, {"file": upload}, format="multipart")
+
+    def test_csv_creates_then_upserts_by_sku(self):
+        today = datetime.date.today().isoformat()
+        body = self.HEADER + (
+            f"A1,Bread loaf,groceries,1.00,3.00,5,{today},18:00,20:00\n"
+            f"A2,Bagel bag,pastries,2.00,4.00,3,{today},18:00,20:00\n"
+        )
+        response = self.upload("stock.csv", body)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["created"], 2)
+        item_id = FoodItem.objects.get(store=self.store, sku="A1").item_id
+
+        body = self.HEADER + f"A1,Bread loaf,groceries,0.50,3.00,9,{today},18:00,20:00\n"
+        report = self.upload("stock.csv", body).json()
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (0, 1, 0))
+        item = FoodItem.objects.get(store=self.store, sku="A1")
+        self.assertEqual((item.item_id, item.available_quantity, str(item.price)), (item_id, 9, "0.50"))
+        self.assertEqual(item.address, "9 Dock Rd")
+        self.assertEqual(FoodItem.objects.filter(store=self.store).count(), 2)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        today = datetime.date.today().isoformat()
+        body = "\n".join([
+            json.dumps({"sku": "N1", "title": "Kefir", "category": "drinks", "price": "1.00",
+                        "price_before": "2.00", "available_quantity": 4, "pickup_date": today,
+                        "pickup_start": "09:00", "pickup_end": "11:00"}),
+            "{not json",
+            json.dumps({"sku": "N2", "title": "Juice", "price": "5.00", "price_before": "2.00",
+                        "available_quantity": 1, "pickup_date": today,
+                        "pickup_start": "09:00", "pickup_end": "11:00"}),
+        ])
+        report = self.upload("stock.ndjson", body).json()
+        self.assertEqual((report["created"], report["failed"]), (1, 2))
+        self.assertEqual([e["row"] for e in report["errors"]], [2, 3])
+        self.assertIn("price", report["errors"][1]["errors"])
+        self.assertTrue(FoodItem.objects.filter(store=self.store, sku="N1").exists())
+
+    def test_update_keeps_optional_columns_the_file_leaves_out(self):
+        item = make_item(self.owner, store=self.store, sku="K1", category="pastries",
+                         description="long desc", address="3 Back Lane")
+        today = datetime.date.today().isoformat()
+        report = self.upload("stock.csv", self.HEADER.replace("category,", "") +
+                             f"K1,Kept box,2.00,4.00,7,{today},18:00,20:00\n").json()
+        self.assertEqual((report["updated"], report["failed"]), (1, 0), report)
+        item.refresh_from_db()
+        self.assertEqual((item.title, item.available_quantity), ("Kept box", 7))
+        self.assertEqual((item.category, item.description, item.address),
+                         ("pastries", "long desc", "3 Back Lane"))
+
+        row = {"sku": "K1", "title": "Kept box", "price": "2.00", "price_before": "4.00",
+               "available_quantity": 7, "pickup_date": today, "pickup_start": "18:00",
+               "pickup_end": "20:00", "category": "meals"}
+        self.upload("stock.ndjson", json.dumps(row))
+        item.refresh_from_db()
+        self.assertEqual((item.category, item.description), ("meals", "long desc"))
+
+    def test_address_column_overrides_the_store_address(self):
+        today = datetime.date.today().isoformat()
+        body = self.HEADER.replace("\n", ",address\n") + (
+            f"D1,Soup,meals,1.00,2.00,3,{today},12:00,14:00,5 Side St\n"
+            f"D2,Salad,meals,1.00,2.00,3,{today},12:00,14:00,\n"
+        )
+        report = self.upload("stock.csv", body).json()
+        self.assertEqual((report["created"], report["failed"]), (2, 0), report)
+        self.assertEqual(FoodItem.objects.get(sku="D1").address, "5 Side St")
+        self.assertEqual(FoodItem.objects.get(sku="D2").address, "9 Dock Rd")
+
+        row = {"sku": "D1", "title": "Soup", "price": "1.00", "price_before": "2.00",
+               "available_quantity": 1, "pickup_date": today, "pickup_start": "12:00",
+               "pickup_end": "14:00", "address": "7 Quay"}
+        report = self.upload("stock.ndjson", json.dumps(row)).json()
+        self.assertEqual((report["updated"], report["failed"]), (1, 0), report)
+        self.assertEqual(FoodItem.objects.get(sku="D1").address, "7 Quay")
+
+    def test_restock_reopens_flash_sale_queue(self):
+        item = make_item(self.owner, store=self.store, sku="F1", flash_sale=True, available_quantity=0)
+        self.addCleanup(flashsale.forget, item.pk)
+        queue = flashsale.queue_for(item)
+        queue._remaining, queue._checked_at = 0, time.monotonic()
+        with self.assertRaises(flashsale.SoldOut):
+            queue.check(1)
+
+        today = datetime.date.today().isoformat()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload("stock.csv", self.HEADER + f"F1,Croissant box,pastries,4.00,10.00,5,{today},08:00,10:00\n")
+        queue.check(1)
+
+    def test_only_the_owner_can_import(self):
+        other = Store.objects.create(owner=User.objects.create_user(email="x@example.com", password="pw"),
+                                     name="Other", address="1 St", city="Almaty")
+        self.assertEqual(self.upload("stock.csv", self.HEADER, store=other).status_code, 404)
+
+    def test_rejects_unknown_format(self):
+        self.assertEqual(self.upload("stock.xlsx", "whatever").status_code, 400)
+
+    def test_management_command(self):
+        today = datetime.date.today().isoformat()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write(self.HEADER + f"C1,Cold brew,drinks,1.00,2.00,2,{today},08:00,10:00\n")
+        self.addCleanup(os.unlink, fh.name)
+        out = io.StringIO()
+        call_command("import_inventory", fh.name, store=str(self.store.store_id), stdout=out)
+        self.assertIn("1 created", out.getvalue())
+        self.assertTrue(FoodItem.objects.filter(store=self.store, sku="C1").exists())
+
+
+class ImageVariantTests(APITestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, IMAGE_VARIANT_WIDTHS=[16])
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(email="owner@example.com", password="pw")
+
+    def save_image(self, name, color):
+        buf = io.BytesIO()
+        Image.new("RGB", (32, 24), color).save(buf, "JPEG")
+        return default_storage.save(name, ContentFile(buf.getvalue()))
+
+    def test_unreadable_source_is_not_retried_on_every_save(self):
+        with self.assertLogs("listings.images", "WARNING"):
+            item = make_item(self.owner, image="food_items/missing.jpg")
+        self.assertEqual(item.image_variants, {"src": "food_items/missing.jpg"})
+        updated_at = FoodItem.objects.get(pk=item.pk).updated_at
+
+        with mock.patch.object(images, "render_variants") as render:
+            item.title = "Renamed"
+            item.save()
+            FoodItem.objects.get(pk=item.pk).save(update_fields=["image"])
+        render.assert_not_called()
+        self.assertIsNone(images.variant_urls(item.image_variants))
+        self.assertGreater(FoodItem.objects.get(pk=item.pk).updated_at, updated_at)
+
+    def test_replaced_image_drops_the_old_variant_files(self):
+        item = make_item(self.owner, image=self.save_image("food_items/a.jpg", "red"))
+        old = set(images._files(item.image_variants).values())
+        self.assertTrue(old and all(default_storage.exists(name) for name in old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.image = self.save_image("food_items/b.jpg", "blue")
+            item.save()
+        new = set(images._files(item.image_variants).values())
+        self.assertTrue(new and all(default_storage.exists(name) for name in new))
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+
+    def test_variants_shared_with_another_row_are_kept(self):
+        name = self.save_image("food_items/shared.jpg", "green")
+        item = make_item(self.owner, image=name)
+        make_item(self.owner, image=name, store=item.store)
+        shared = set(images._files(item.image_variants).values())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.image = self.save_image("food_items/c.jpg", "blue")
+            item.save()
+        self.assertTrue(all(default_storage.exists(name) for name in shared))
+
+
+class SeedCatalogTests(TestCase):
+    def seed(self, **counts):
+        options = dict(users=0, stores=0, items=0, reservations=0, cart_items=0, stdout=io.StringIO())
+        options.update(counts)
+        call_command("seed_catalog", **options)
+
+    def test_counts_that_leave_nothing_to_pick_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, "--users >= 1"):
+            self.seed(stores=2)
+        with self.assertRaisesMessage(CommandError, "--stores >= 1"):
+            self.seed(users=1, items=2)
+        with self.assertRaisesMessage(CommandError, "0 or more"):
+            self.seed(users=-1)
+
+    def test_small_catalog(self):
+        self.seed(users=2, stores=2, items=5, reservations=3, cart_items=2)
+        self.assertEqual((Store.objects.count(), FoodItem.objects.count()), (2, 5))
+
+
+class ActiveListingTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="pw")
+        self.live = make_item(self.owner)
+        self.past = make_item(self.owner, store=self.live.store,
+                              pickup_date=datetime.date.today() - datetime.timedelta(days=1))
+        self.client = APIClient()
+
+    def test_window_is_checked_against_the_clock(self):
+        item = make_item(self.owner, store=self.live.store, pickup_date=datetime.date(2026, 5, 1),
+                         pickup_start=datetime.time(17, 0), pickup_end=datetime.time(20, 0))
+        qs = FoodItem.objects.filter(pk=item.pk)
+        before = timezone.make_aware(datetime.datetime(2026, 5, 1, 19, 59))
+        after = timezone.make_aware(datetime.datetime(2026, 5, 1, 20, 0))
+        self.assertTrue(qs.active(before).exists())
+        self.assertFalse(qs.active(after).exists())
+        self.assertTrue(qs.expired(after).exists())
+
+    def test_list_leaves_out_expired_items(self):
+        ids = [r["item_id"] for r in self.client.get("/api/fooditems/").json()["results"]]
+        self.assertEqual(ids, [str(self.live.item_id)])
+
+    def test_sweeper_zeroes_expired_stock_in_batches(self):
+        more = make_item(self.owner, store=self.live.store,
+                         pickup_date=datetime.date.today() - datetime.timedelta(days=2))
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sweep_expired_listings", batch_size=1, stdout=out)
+        self.assertIn("Swept 2", out.getvalue())
+        stock = dict(FoodItem.objects.values_list("pk", "available_quantity"))
+        self.assertEqual((stock[self.past.pk], stock[more.pk], stock[self.live.pk]), (0, 0, 5))
+
+
+class ReservationExportTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="pw")
+        self.buyer = User.objects.create_user(email="buyer@example.com", password="pw")
+        self.item = make_item(self.owner, sku="CR-1")
+        self.other_item = make_item(User.objects.create_user(email="x@example.com", password="pw"))
+        self.old = Reservation.objects.create(user=self.buyer, food_item=self.item, quantity=1)
+        Reservation.objects.filter(pk=self.old.pk).update(
+            reserved_at=timezone.now() - datetime.timedelta(days=10)
+        )
+        self.new = Reservation.objects.create(user=self.buyer, food_item=self.item, quantity=2)
+        Reservation.objects.create(user=self.buyer, food_item=self.other_item, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, **params):
+        response = self.client.get("/api/reservations/export/", params)
+        body = b"".join(response.streaming_content).decode() if response.streaming else None
+        return response, body
+
+    def test_ndjson_covers_only_the_owners_stores(self):
+        response, body = self.export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r["id"] for r in rows], [self.old.pk, self.new.pk])
+        self.assertEqual(rows[1]["item_id"], str(self.item.item_id))
+        self.assertEqual((rows[1]["sku"], rows[1]["user_email"], rows[1]["price"]),
+                         ("CR-1", "buyer@example.com", "4.00"))
+
+    def test_csv_with_date_range(self):
+        since = (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+        response, body = self.export(format="csv", **{"from": since})
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(r["id"]) for r in rows], [self.new.pk])
+        self.assertEqual(rows[0]["quantity"], "2")
+
+        until = (timezone.now() - datetime.timedelta(days=5)).date().isoformat()
+        _, body = self.export(format="csv", to=until)
+        self.assertEqual([int(r["id"]) for r in csv.DictReader(io.StringIO(body))], [self.old.pk])
+
+    def test_store_filter_and_bad_params(self):
+        self.assertEqual(self.export(store=str(self.other_item.store.store_id))[0].status_code, 404)
+        self.assertEqual(self.export(store="nope")[0].status_code, 404)
+        self.assertEqual(self.export(format="xml")[0].status_code, 400)
+        self.assertEqual(self.export(**{"from": "2026-02-30"})[0].status_code, 400)
+        _, body = self.export(store=str(self.item.store.store_id))
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command("export_reservations", format="csv", store=str(self.item.store.store_id), stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([int(r["id"]) for r in rows], [self.old.pk, self.new.pk])
+
+
+class AsyncViewTests(APITestCase):
+    """The ASYNC_VIEWS versions answer exactly like the DRF views."""
+
+    def setUp(self):
+        owner = User.objects.create_user(email="owner@example.com", password="pw")
+        self.items = [make_item(owner, title=f"Box {i}") for i in range(3)]
+        self.factory = AsyncRequestFactory()
+
+    async def test_list_matches_sync_view(self):
+        params = {"page_size": 2, "fields": "item_id,title"}
+        expected = (await sync_to_async(self.client.get)("/api/fooditems/", params)).json()
+        response = await FoodItemListAsyncView.as_view()(self.factory.get("/api/fooditems/", params))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected)
+
+    async def test_list_bad_cursor_is_404(self):
+        request = self.factory.get("/api/fooditems/", {"cursor": "garbage"})
+        response = await FoodItemListAsyncView.as_view()(request)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), {"detail": "Invalid cursor"})
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=60)
+    async def test_list_cache_is_shared_with_sync_view(self):
+        await sync_to_async(cache.clear)()
+        await sync_to_async(self.client.get)("/api/fooditems/")
+        with mock.patch.object(KeysetPagination, "apaginate_queryset") as paginate:
+            response = await FoodItemListAsyncView.as_view()(self.factory.get("/api/fooditems/"))
+        paginate.assert_not_called()
+        self.assertEqual(len(json.loads(response.content)["results"]), 3)
+
+    async def test_detail_etag_and_404(self):
+        item = self.items[0]
+        url = f"/api/fooditems/{item.item_id}/"
+        expected = await sync_to_async(self.client.get)(url)
+        view = FoodItemDetailAsyncView.as_view()
+
+        response = await view(self.factory.get(url), item_id=item.item_id)
+        self.assertEqual(json.loads(response.content), expected.json())
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+        request = self.factory.get(url, headers={"If-None-Match": expected["ETag"]})
+        response = await view(request, item_id=item.item_id)
+        self.assertEqual(response.status_code, 304)
+        response = await view(self.factory.get(url), item_id=uuid.uuid4())
+        self.assertEqual(response.status_code, 404)
+
+    async def test_middleware_counts_async_queries(self):
+        from backend.querybudget import QueryBudgetExceeded, QueryBudgetMiddleware
+
+        async def view(request):
+            request._query_budget = 1
+            await FoodItem.objects.acount()
+            await FoodItem.objects.acount()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        with self.assertRaises(QueryBudgetExceeded):
+            await middleware(self.factory.get("/"))
+
+
+@override_settings(METRICS_TOKEN="scrape-me", METRICS_DIR="")
+class MetricsTests(APITestCase):
+    def scrape(self, token="scrape-me"):
+        return self.client.get("/api/_metrics", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_records_per_view_metrics(self):
+        make_item(User.objects.create_user(email="owner@example.com", password="pw"))
+        self.assertEqual(self.client.get("/api/fooditems/").status_code, 200)
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('api_responses_total{method="GET",view="fooditem-list",status="200"}', body)
+        self.assertIn('api_request_duration_seconds_bucket{method="GET",view="fooditem-list",le="+Inf"}', body)
+        self.assertIn('api_db_queries_bucket{view="fooditem-list",le="1"}', body)
+        self.assertIn('api_response_bytes_total{view="fooditem-list"}', body)
+
+    def test_requires_token(self):
+        self.assertEqual(self.scrape("wrong").status_code, 403)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.scrape().status_code, 404)
+
+    def test_sums_worker_snapshots(self):
+        from backend import metrics
+
+        labels = [["method", "GET"], ["status", "200"], ["view", "other-worker"]]
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            for pid in (101, 102):
+                with open(os.path.join(directory, f"{pid}.json"), "w") as fh:
+                    json.dump({"counters": [["api_responses_total", labels, 3]], "histograms": []}, fh)
+            counters, _ = metrics.collect()
+            self.assertTrue(os.path.exists(os.path.join(directory, f"{os.getpid()}.json")))
+        key = ("api_responses_total", tuple(map(tuple, labels)))
+        self.assertEqual(counters[key], 6)
+
+
+class MediaServingTests(TestCase):
+    body = bytes(range(256)) * 4
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, MEDIA_ACCEL="", MEDIA_MAX_AGE=600)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.root = media.name
+        os.makedirs(os.path.join(self.root, "food_items"))
+        for name in ("a.jpg", "a.0123456789.w16.webp"):
+            with open(os.path.join(self.root, "food_items", name), "wb") as fh:
+                fh.write(self.body)
+
+    def get(self, path="food_items/a.jpg", **headers):
+        return self.client.get(f"/media/{path}", **headers)
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_serves_the_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.body)
+        self.assertEqual(response["Content-Length"], str(len(self.body)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "public, max-age=600")
+
+    def test_single_ranges(self):
+        size = len(self.body)
+        for header, start, end in (
+            ("bytes=10-19", 10, 19),
+            ("bytes=1000-", 1000, size - 1),
+            ("bytes=-5", size - 5, size - 1),
+            ("bytes=1020-5000", 1020, size - 1),
+        ):
+            with self.subTest(header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(self.content(response), self.body[start:end + 1])
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        response = self.get(HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Range", response)
+        self.assertEqual(self.content(response), self.body)
+
+    def test_unsatisfiable_range(self):
+        for header in (f"bytes={len(self.body)}-", "bytes=-0", "bytes=20-10"):
+            with self.subTest(header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], f"bytes */{len(self.body)}")
+
+    def test_if_range(self):
+        etag, modified = self.get()["ETag"], self.get()["Last-Modified"]
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=modified).status_code, 206)
+
+        stale = self.get(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.content(stale), self.body)
+        old = self.get(HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE="Thu, 01 Jan 1970 00:00:00 GMT")
+        self.assertEqual(old.status_code, 200)
+
+    def test_if_none_match(self):
+        etag = self.get()["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_hashed_variants_are_immutable(self):
+        response = self.get("food_items/a.0123456789.w16.webp")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Content-Type"], "image/webp")
+
+    def test_accel_hands_the_file_to_the_proxy(self):
+        with override_settings(MEDIA_ACCEL="nginx", MEDIA_ACCEL_PREFIX="/protected-media/"):
+            response = self.get(HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/food_items/a.jpg")
+        self.assertEqual(response.content, b"")
+
+        with override_settings(MEDIA_ACCEL="sendfile"):
+            response = self.get()
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.root, "food_items", "a.jpg"))
+
+    def test_paths_outside_media_root_are_not_found(self):
+        self.assertEqual(self.get("../manage.py").status_code, 404)
+        self.assertEqual(self.get("%2e%2e/%2e%2e/etc/passwd").status_code, 404)
+        self.assertEqual(self.get("food_items/").status_code, 404)
+        self.assertEqual(self.get("food_items/missing.jpg").status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs row-level locking")
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class ReservationStressTests(TransactionTestCase):
+    """Thousands of concurrent single-unit reservations against one row."""
+
+    def test_parallel_reservations_never_oversell(self):
+        self.hammer(flash_sale=False)
+
+    def test_parallel_flash_sale_never_oversells(self):
+        self.hammer(flash_sale=True)
+
+    def hammer(self, flash_sale):
+        users = [
+            User.objects.create_user(email=f"buyer{i}@example.com", password="pw")
+            for i in range(STRESS_THREADS)
+        ]
+        item = make_item(users[0], available_quantity=STRESS_STOCK, flash_sale=flash_sale)
+
+        per_thread = STRESS_REQUESTS // STRESS_THREADS
+        statuses = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(STRESS_THREADS)
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            seen = []
+            try:
+                start.wait()
+                for _ in range(per_thread):
+                    response = client.post(
+                        "/api/reservations/", {"food_item": item.pk, "quantity": 1}, format="json"
+                    )
+                    seen.append(response.status_code)
+            except Exception as exc:  # surfaced below, not swallowed
+                errors.append(exc)
+            finally:
+                connections.close_all()
+                with lock:
+                    statuses.extend(seen)
+
+        threads = [threading.Thread(target=worker, args=(u,)) for u in users]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+
+        self.assertEqual(errors, [])
+        total = per_thread * STRESS_THREADS
+        self.assertEqual(len(statuses), total)
+        self.assertEqual(set(statuses) - {201, 400, 409}, set())
+
+        item.refresh_from_db()
+        created = statuses.count(201)
+        self.assertEqual(created, min(total, STRESS_STOCK))
+        self.assertEqual(Reservation.objects.filter(food_item=item).count(), created)
+        self.assertEqual(item.available_quantity, STRESS_STOCK - created)
+
+        label = "reservations (flash sale)" if flash_sale else "reservations"
+        print(
+            f"\n{label}: {total} requests / {STRESS_THREADS} threads in {elapsed:.2f}s "
+            f"({total / elapsed:.0f} req/s), {created} reserved, {total - created} rejected"
+        )
@@ -1,20 +1,37 @@
 # urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import (
     FoodItemListView,
+    FoodItemSuggestView,
+    MapClusterView,
     FoodItemDetailView,
     ReservationListCreateView,
     CartViewSet,            # 👈 add this
+    InventoryImportView,
+    ReservationExportView,
 )
 
+from .async_views import FoodItemListAsyncView, FoodItemDetailAsyncView
+
+# ASYNC_VIEWS: native async views for ASGI deployments
+if settings.ASYNC_VIEWS:
+    fooditem_list, fooditem_detail = FoodItemListAsyncView.as_view(), FoodItemDetailAsyncView.as_view()
+else:
+    fooditem_list, fooditem_detail = FoodItemListView.as_view(), FoodItemDetailView.as_view()
+
 router = DefaultRouter()
 router.register(r"cart", CartViewSet, basename="cart")
 
 urlpatterns = [
-    path("fooditems/", FoodItemListView.as_view(), name="fooditem-list"),
-    path("fooditems/<uuid:item_id>/", FoodItemDetailView.as_view(), name="fooditem-detail"),
+    path("fooditems/", fooditem_list, name="fooditem-list"),
+    path("fooditems/suggest/", FoodItemSuggestView.as_view(), name="fooditem-suggest"),
+    path("fooditems/<uuid:item_id>/", fooditem_detail, name="fooditem-detail"),
+    path("map/clusters/", MapClusterView.as_view(), name="map-clusters"),
     path("reservations/", ReservationListCreateView.as_view(), name="reservation-list-create"),
+    path("reservations/export/", ReservationExportView.as_view(), name="reservation-export"),
+    path("stores/<uuid:store_id>/inventory/", InventoryImportView.as_view(), name="store-inventory-import"),
     path("", include(router.urls)),     # 👈 exposes /cart/, /cart/{id}/, etc.
 ]
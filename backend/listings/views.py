@@ -2,10 +2,10 @@ from django.shortcuts import render
 
 # Create your views here.
 from rest_framework.generics import ListAPIView, RetrieveAPIView
-from .models import FoodItem, Reservation, CartItem
+from .models import FoodItem, Reservation, CartItem, Store
 from .serializers import FoodItemSerializer, CartItemSerializer
 from rest_framework import generics, permissions
-from .serializers import ReservationSerializer
+from .serializers import ReservationSerializer, CartBulkSerializer
 from rest_framework.permissions import AllowAny
 
 from rest_framework import mixins, viewsets
@@ -20,11 +20,33 @@ from rest_framework import status
 from django.db.models import Q
 
 # views.py
+import math
 import re
-from django.db.models import F, FloatField, ExpressionWrapper, Value
-from django.db.models.functions import ACos, Cos, Sin, Radians, Least, Greatest
 from django.db.models import Q
 import re
+from .geo import nearby_q, distance_expression, cluster_cell_deg
+from django.db.models import Avg, Count, Min, Value
+from django.db.models.functions import Floor
+from .pagination import KeysetPagination
+from .sparse import SparseFieldsetViewMixin, fieldset_params
+import hashlib
+from .cache import listings_cache, round_to_grid, versioned_key, item_validators_key, item_payload_key
+from .cache import bump_catalog_version, invalidate_items
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.conf import settings
+from .search import apply_search, suggest, SUGGEST_MIN_LENGTH, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import NotFound
+from backend.querybudget import query_budget
+from .inventory import InventoryImport, detect_format, iter_rows
+from . import flashsale
+from django.db.models import Case, When, PositiveIntegerField
+from django.utils import timezone
+import uuid
+from django.http import StreamingHttpResponse
+from .export import EXPORT_FORMATS, export_queryset, iter_export, parse_bound
 
 CATEGORY_MAP = {
     "grocery": "groceries",
@@ -35,99 +57,349 @@ CATEGORY_MAP = {
     "pastries": "pastries",
 }
 
-def _safe_float(v):
+def _safe_float(v, lo=None, hi=None):
+    """float(v) clamped to [lo, hi]; None when missing, malformed, nan or inf."""
     try:
-        return float(v)
+        v = float(v)
     except (TypeError, ValueError):
         return None
+    if not math.isfinite(v):
+        return None
+    if lo is not None:
+        v = max(v, lo)
+    if hi is not None:
+        v = min(v, hi)
+    return v
+
+def _safe_uuid(v):
+    try:
+        return uuid.UUID(str(v))
+    except ValueError:
+        return None
 
-class FoodItemListView(ListAPIView):
+@query_budget(1)
+class FoodItemListView(SparseFieldsetViewMixin, ListAPIView):
     serializer_class = FoodItemSerializer
+    pagination_class = KeysetPagination
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    def get_filter_params(self):
+        """
+        Canonical form of the list filters: categories mapped + sorted,
+        q terms lowercased, lat/lng as given (clamped). Used to build the
+        queryset and, with lat/lng snapped, as the response-cache key.
+        """
+        if hasattr(self, "_filter_params"):
+            return self._filter_params
+        params = self.request.query_params
+
+        # ----- category (supports ?category=a&category=b OR comma-separated) -----
+        raw = []
+        for value in params.getlist("category"):
+            raw += [p.strip() for p in value.split(",") if p.strip()]
+        categories = sorted({CATEGORY_MAP[r.lower()] for r in raw if r.lower() in CATEGORY_MAP})
+
+        q = " ".join(t for t in re.split(r"\s+", (params.get("q") or "").lower()) if t)
+
+        lat = _safe_float(params.get("lat"), -90.0, 90.0)
+        lng = _safe_float(params.get("lng"), -180.0, 180.0)
+        if lat is None or lng is None:
+            lat = lng = None
+
+        self._filter_params = {
+            "categories": categories,
+            "q": q,
+            "lat": lat,
+            "lng": lng,
+            "max_km": _safe_float(params.get("max_distance_km"), 0.0),
+        }
+        return self._filter_params
+
     def get_queryset(self):
+        f = self.get_filter_params()
         qs = (FoodItem.objects
-              .filter(available_quantity__gt=0)
-              .select_related("store"))
-
-        # ----- category filter (supports ?category=a&category=b OR comma-separated) -----
-        raw = self.request.query_params.getlist("category")
-        if not raw:
-            comma = self.request.query_params.get("category")
-            if comma:
-                raw = [p.strip() for p in comma.split(",") if p.strip()]
-        if raw:
-            normalized = []
-            for r in raw:
-                key = r.strip().lower()
-                mapped = CATEGORY_MAP.get(key)
-                if mapped:
-                    normalized.append(mapped)
-            if normalized:
-                qs = qs.filter(category__in=normalized)
+              .active()
+              .select_related("store")
+              .defer("search_vector"))
+
+        if f["categories"]:
+            qs = qs.filter(category__in=f["categories"])
 
         # ----- text search (?q=...) -----
-        q = (self.request.query_params.get("q") or "").strip()
-        if q:
-            terms = [t for t in re.split(r"\s+", q) if t]
-            for term in terms:
-                qs = qs.filter(
-                    Q(title__icontains=term)
-                    | Q(description__icontains=term)
-                    | Q(address__icontains=term)
-                    | Q(store__name__icontains=term)
-                )
+        if f["q"]:
+            qs = apply_search(qs, f["q"])
 
         # ----- nearest-by-store (?lat=...&lng=...&max_distance_km=...) -----
-        lat = _safe_float(self.request.query_params.get("lat"))
-        lng = _safe_float(self.request.query_params.get("lng"))
-        max_km = _safe_float(self.request.query_params.get("max_distance_km"))
+        lat, lng, max_km = f["lat"], f["lng"], f["max_km"]
 
         if lat is not None and lng is not None:
-            acos_arg = Least(
-                Value(1.0),
-                Greatest(
-                    Value(-1.0),
-                    Cos(Radians(Value(lat))) * Cos(Radians(F("store__latitude"))) *
-                    Cos(Radians(F("store__longitude") - Value(lng))) +
-                    Sin(Radians(Value(lat))) * Sin(Radians(F("store__latitude")))
-                ),
-            )
-            distance_expr = ExpressionWrapper(
-                Value(6371.0) * ACos(acos_arg),
-                output_field=FloatField()
-            )
+            if max_km is not None:
+                # index-backed geohash/box prefilter; only survivors get the trig below
+                qs = qs.filter(nearby_q(lat, lng, max_km))
+            distance_expr = distance_expression(lat, lng)
             qs = qs.annotate(distance_km=distance_expr)
             if max_km is not None:
                 qs = qs.filter(distance_km__lte=max_km)
-            qs = qs.order_by("distance_km", "-created_at")
+            # stores without coordinates go last on every backend
+            qs = qs.order_by(F("distance_km").asc(nulls_last=True), "-created_at", "-id")
+        elif "search_rank" in qs.query.annotations:
+            qs = qs.order_by("-search_rank", "-created_at", "-id")
         else:
-            qs = qs.order_by("-created_at")
+            qs = qs.order_by("-created_at", "-id")
+
+        return self.trim_queryset(qs)
+
+    def cache_key_params(self, request):
+        # lat/lng snap to LISTINGS_CACHE_GRID_DEG so nearby callers share an
+        # entry; a cached page's distances are those of the first caller in
+        # the cell, while uncached requests use the exact point
+        paginator = self.paginator
+        fields, omit = fieldset_params(request)
+        f = self.get_filter_params()
+        return {
+            **f,
+            "lat": round_to_grid(f["lat"]),
+            "lng": round_to_grid(f["lng"]),
+            "fields": fields,
+            "omit": omit,
+            "host": request.get_host(),
+            "cursor": request.query_params.get(paginator.cursor_query_param),
+            "page_size": paginator.get_page_size(request),
+        }
 
-        return qs
+    def list(self, request, *args, **kwargs):
+        timeout = settings.LISTINGS_CACHE_TIMEOUT
+        if timeout <= 0:
+            return super().list(request, *args, **kwargs)
 
+        key = versioned_key("fooditems", self.cache_key_params(request))
+        cache = listings_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_page_response(request, cached)
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, self.page_cache_entry(response.data["results"]), timeout)
+        return response
 
+    def page_cache_entry(self, results):
+        # the next link is rebuilt per request so it never carries another client's query string
+        return {"results": results, "cursor": self.paginator.get_next_cursor()}
 
-class FoodItemDetailView(RetrieveAPIView):
-    queryset = FoodItem.objects.all()
+    def cached_page_response(self, request, cached):
+        return Response({
+            "next": self.paginator.build_next_link(request, cached["cursor"]),
+            "results": cached["results"],
+        })
+
+
+
+@query_budget(1)
+class MapClusterView(APIView):
+    """
+    GET /map/clusters/?bbox=minLng,minLat,maxLng,maxLat&zoom=12[&category=..]
+    Stores with available items, grouped into zoom-sized grid cells by a
+    single GROUP BY over the (latitude, longitude)-indexed box.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in request.query_params["bbox"].split(","))
+        except (KeyError, ValueError):
+            raise ValidationError({"bbox": "Expected bbox=minLng,minLat,maxLng,maxLat."})
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+            raise ValidationError({"bbox": "Coordinates out of range."})
+        try:
+            zoom = max(0, min(int(request.query_params.get("zoom", 12)), 22))
+        except ValueError:
+            raise ValidationError({"zoom": "Expected an integer."})
+
+        raw = []
+        for value in request.query_params.getlist("category"):
+            raw += [p.strip().lower() for p in value.split(",") if p.strip()]
+        categories = sorted({CATEGORY_MAP[r] for r in raw if r in CATEGORY_MAP})
+
+        # a box crossing the antimeridian comes in with min_lng > max_lng
+        crosses = min_lng > max_lng
+        lng_span = (max_lng + 360 - min_lng) if crosses else (max_lng - min_lng)
+        cell = cluster_cell_deg(zoom, min_lat, max_lat, lng_span)
+
+        timeout = settings.LISTINGS_CACHE_TIMEOUT
+        key = versioned_key("mapclusters", {
+            "bbox": [min_lng, min_lat, max_lng, max_lat], "cell": cell, "categories": categories,
+        })
+        cache = listings_cache()
+        if timeout > 0:
+            cached = cache.get(key)
+            if cached is not None:
+                return Response(cached)
+
+        lng_q = (Q(store__longitude__gte=min_lng) | Q(store__longitude__lte=max_lng)) if crosses \
+            else Q(store__longitude__range=(min_lng, max_lng))
+        qs = FoodItem.objects.active().filter(
+            lng_q,
+            store__latitude__range=(min_lat, max_lat),
+        )
+        if categories:
+            qs = qs.filter(category__in=categories)
+
+        rows = (qs
+                .annotate(
+                    cell_x=Floor((F("store__longitude") + Value(180.0)) / Value(cell)),
+                    cell_y=Floor((F("store__latitude") + Value(90.0)) / Value(cell)),
+                )
+                .values("cell_x", "cell_y")
+                .annotate(
+                    stores=Count("store", distinct=True),
+                    items=Count("id"),
+                    lat=Avg("store__latitude"),
+                    lng=Avg("store__longitude"),
+                    min_price=Min("price"),
+                )
+                .order_by())
+
+        clusters = [{
+            "lat": round(r["lat"], 6),
+            "lng": round(r["lng"], 6),
+            "stores": r["stores"],
+            "items": r["items"],
+            "min_price": f"{r['min_price']:.2f}",
+        } for r in rows]
+
+        data = {"zoom": zoom, "cell_deg": cell, "clusters": clusters}
+        if timeout > 0:
+            cache.set(key, data, timeout)
+        return Response(data)
+
+
+
+@query_budget(2)
+class FoodItemSuggestView(APIView):
+    """GET /fooditems/suggest/?q=cro&limit=8 -> typeahead strings with scores."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        q = (request.query_params.get("q") or "").strip()
+        try:
+            limit = int(request.query_params.get("limit", SUGGEST_DEFAULT_LIMIT))
+        except (TypeError, ValueError):
+            limit = SUGGEST_DEFAULT_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        if len(q) < SUGGEST_MIN_LENGTH:
+            return Response({"query": q, "results": []})
+        return Response({"query": q, "results": suggest(q, limit)})
+
+
+
+@query_budget(1)
+class FoodItemDetailView(SparseFieldsetViewMixin, RetrieveAPIView):
     serializer_class = FoodItemSerializer
     lookup_field = "item_id"
     authentication_classes = []
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        qs = FoodItem.objects.select_related("store").defer("search_vector")
+        # updated_at feeds the validators even when the client didn't ask for it
+        return self.trim_queryset(qs, "updated_at")
+
+    def retrieve(self, request, *args, **kwargs):
+        item_id = str(kwargs[self.lookup_field])
+        host = request.get_host()
+        cache = listings_cache()
+        timeout = settings.LISTINGS_ITEM_CACHE_TIMEOUT
+
+        variant = self.etag_variant(request)
+
+        validators = cache.get(item_validators_key(item_id))
+        if validators is not None:
+            etag = self.etag_for(validators, variant)
+            response = self.not_modified(request, etag, validators)
+            if response is not None:
+                return response
+            data = cache.get(item_payload_key(item_id, etag, host))
+            if data is not None:
+                return self.with_validators(Response(data), etag, validators)
+
+        instance = self.get_object()
+        validators = self.validators_for(instance)
+        cache.set(item_validators_key(item_id), validators, timeout)
+        etag = self.etag_for(validators, variant)
+
+        # answer revalidation before paying for serialization
+        response = self.not_modified(request, etag, validators)
+        if response is not None:
+            return response
+
+        data = self.get_serializer(instance).data
+        cache.set(item_payload_key(item_id, etag, host), data, timeout)
+        return self.with_validators(Response(data), etag, validators)
+
+    @staticmethod
+    def etag_variant(request):
+        # each fieldset is its own representation, so it gets its own ETag
+        fields, omit = fieldset_params(request)
+        if fields is None and not omit:
+            return ""
+        return "-" + hashlib.sha1(repr((fields, omit)).encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def etag_for(validators, variant):
+        return f'"{validators["version"]}{variant}"'
+
+    @staticmethod
+    def validators_for(instance):
+        return {
+            "version": f"{instance.pk}-{int(instance.updated_at.timestamp() * 1_000_000)}",
+            "last_modified": instance.updated_at.timestamp(),
+        }
+
+    @classmethod
+    def not_modified(cls, request, etag, validators):
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(validators["last_modified"])
+        )
+        if response is not None:
+            cls.with_validators(response, etag, validators)
+        return response
+
+    @staticmethod
+    def with_validators(response, etag, validators):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(validators["last_modified"])
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
-class ReservationListCreateView(generics.ListCreateAPIView):
+
+# auth + list / auth + item + UPDATE + INSERT + re-read
+@query_budget({"get": 2, "post": 5})
+class ReservationListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     serializer_class = ReservationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user).select_related('food_item')
+        qs = (Reservation.objects
+              .filter(user=self.request.user)
+              .select_related("user", "food_item__store"))
+        return self.trim_queryset(qs)
+
+    def create(self, request, *args, **kwargs):
+        # hot items this process has seen sell out are refused before any query
+        data = request.data if hasattr(request.data, "get") else {}
+        flashsale.reject_if_sold_out(data.get("food_item"), data.get("quantity", 1))
+        return super().create(request, *args, **kwargs)
 
 
 
-class CartViewSet(viewsets.GenericViewSet,
+@query_budget({"list": 2, "update": 3, "partial_update": 3, "destroy": 3,
+               "clear": 2, "bulk": 5, "checkout": 6})
+class CartViewSet(SparseFieldsetViewMixin,
+                  viewsets.GenericViewSet,
                   mixins.ListModelMixin,
                   mixins.UpdateModelMixin,
                   mixins.DestroyModelMixin):
@@ -135,11 +407,169 @@ class CartViewSet(viewsets.GenericViewSet,
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return (CartItem.objects
-                .filter(user=self.request.user)
-                .select_related("food_item"))
+        qs = (CartItem.objects
+              .filter(user=self.request.user)
+              .select_related("food_item__store"))
+        return self.trim_queryset(qs)
     # DELETE /cart/clear/
     @action(detail=False, methods=["delete"])
     def clear(self, request):
         deleted, _ = self.get_queryset().delete()
-        return Response({"deleted": deleted}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({"deleted": deleted}, status=status.HTTP_204_NO_CONTENT)
+
+    # POST /cart/bulk/  [{"item_id": ..., "quantity": n}, ...]  (quantity 0 deletes)
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        data = {"items": request.data} if isinstance(request.data, list) else request.data
+        payload = CartBulkSerializer(data=data)
+        payload.is_valid(raise_exception=True)
+        rows = payload.validated_data["items"]
+
+        pks = dict(FoodItem.objects
+                   .filter(item_id__in=[r["item_id"] for r in rows])
+                   .values_list("item_id", "pk"))
+        missing = [str(r["item_id"]) for r in rows if r["item_id"] not in pks]
+        upserts = [
+            CartItem(user=request.user, food_item_id=pks[r["item_id"]], quantity=r["quantity"])
+            for r in rows if r["item_id"] in pks and r["quantity"] > 0
+        ]
+        removals = [pks[r["item_id"]] for r in rows if r["item_id"] in pks and r["quantity"] == 0]
+
+        with transaction.atomic():
+            if removals:
+                CartItem.objects.filter(user=request.user, food_item_id__in=removals).delete()
+            if upserts:
+                CartItem.objects.bulk_create(
+                    upserts,
+                    update_conflicts=True,
+                    unique_fields=["user", "food_item"],
+                    update_fields=["quantity"],
+                )
+
+        items = self.get_serializer(self.get_queryset(), many=True).data
+        return Response({"items": items, "missing": missing})
+
+    # POST /cart/checkout/  whole cart -> reservations, all or nothing
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        with transaction.atomic():
+            lines = dict(CartItem.objects
+                         .select_for_update()
+                         .filter(user=request.user)
+                         .values_list("food_item_id", "quantity"))
+            wanted = {pk: qty for pk, qty in lines.items() if qty > 0}
+            if not wanted:
+                return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # pk order: two checkouts sharing items can't deadlock each other
+            items = list(FoodItem.objects
+                         .select_for_update(of=("self",))
+                         .select_related("store")
+                         .filter(pk__in=wanted)
+                         .order_by("pk"))
+
+            shortfalls = [
+                {"item_id": str(i.item_id), "title": i.title,
+                 "requested": wanted[i.pk], "available": i.available_quantity}
+                for i in items if i.available_quantity < wanted[i.pk]
+            ]
+            if shortfalls:
+                return Response(
+                    {"detail": "Not enough quantity available.", "shortfalls": shortfalls},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            # one UPDATE; each row only matches if it still covers its quantity
+            enough = Q()
+            for pk, qty in wanted.items():
+                enough |= Q(pk=pk, available_quantity__gte=qty)
+            updated = FoodItem.objects.filter(enough).update(
+                available_quantity=Case(
+                    *[When(pk=pk, then=F("available_quantity") - qty) for pk, qty in wanted.items()],
+                    default=F("available_quantity"),
+                    output_field=PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(wanted):
+                transaction.set_rollback(True)
+                return Response({"detail": "Cart changed during checkout, try again."},
+                                status=status.HTTP_409_CONFLICT)
+
+            reservations = Reservation.objects.bulk_create([
+                Reservation(user=request.user, food_item=item, quantity=wanted[item.pk])
+                for item in items
+            ])
+            CartItem.objects.filter(user=request.user, food_item_id__in=lines).delete()
+
+            for item in items:
+                item.available_quantity -= wanted[item.pk]
+            item_ids = [item.item_id for item in items]
+            transaction.on_commit(bump_catalog_version)
+            transaction.on_commit(lambda: invalidate_items(item_ids))
+
+        data = ReservationSerializer(reservations, many=True, context=self.get_serializer_context()).data
+        return Response({"reservations": data}, status=status.HTTP_201_CREATED)
+
+
+# POST /stores/<store_id>/inventory/  multipart "file": .csv or .ndjson
+class InventoryImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, store_id):
+        store = Store.objects.filter(store_id=store_id, owner=request.user).first()
+        if store is None:
+            raise NotFound("Store not found.")
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Upload a CSV or NDJSON file."})
+        fmt = detect_format(upload.name, upload.content_type)
+        if fmt is None:
+            raise ValidationError({"file": "Expected a .csv or .ndjson file."})
+
+        # Django spools large uploads to disk; rows are read from there lazily
+        report = InventoryImport(store).run(iter_rows(upload, fmt))
+        return Response(report)
+
+
+
+class ReservationExportView(APIView):
+    """
+    GET /api/reservations/export/?format=ndjson|csv&store=<uuid>&from=<date>&to=<date>
+
+    Reservations on the caller's stores (every store for staff), streamed.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= names the export format, not a renderer; errors stay JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        params = request.query_params
+        fmt = params.get("format", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({"format": f"Use one of: {', '.join(EXPORT_FORMATS)}."})
+
+        bounds = {}
+        for key in ("from", "to"):
+            bounds[key] = parse_bound(params.get(key), end=key == "to")
+            if params.get(key) and bounds[key] is None:
+                raise ValidationError({key: "Expected an ISO date or datetime."})
+
+        stores = Store.objects.all() if request.user.is_staff else Store.objects.filter(owner=request.user)
+        store = None
+        if params.get("store"):
+            store = stores.filter(store_id=_safe_uuid(params["store"])).first()
+            if store is None:
+                raise NotFound("Store not found.")
+        qs = Reservation.objects.all() if request.user.is_staff else Reservation.objects.filter(
+            food_item__store__owner=request.user
+        )
+
+        rows = export_queryset(qs, store=store, since=bounds["from"], until=bounds["to"])
+        response = StreamingHttpResponse(iter_export(rows, fmt), content_type=EXPORT_FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="reservations.{fmt}"'
+        response["Cache-Control"] = "no-store"
+        return response